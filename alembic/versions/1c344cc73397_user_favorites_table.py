@@ -0,0 +1,83 @@
+"""user_favorites table
+
+Revision ID: 1c344cc73397
+Revises: 35b2406f398c
+Create Date: 2026-10-18 11:04:19.532806
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+import pytz
+
+
+# revision identifiers, used by Alembic.
+revision = '1c344cc73397'
+down_revision = '35b2406f398c'
+branch_labels = None
+depends_on = None
+
+
+users = sa.table('users', sa.column('id', sa.Integer), sa.column('favorites', sa.String))
+posts = sa.table('posts', sa.column('id', sa.Integer))
+user_favorites = sa.table(
+    'user_favorites',
+    sa.column('user_id', sa.Integer),
+    sa.column('post_id', sa.Integer),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def upgrade():
+    op.create_table('user_favorites',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'post_id')
+    )
+    op.create_index(op.f('ix_user_favorites_post_id'), 'user_favorites', ['post_id'], unique=False)
+    op.create_index('ix_user_favorites_user_id_created_at', 'user_favorites', ['user_id', 'created_at', 'post_id'], unique=False)
+
+    # Move the comma-separated ids into rows, skipping duplicates and deleted posts
+    bind = op.get_bind()
+    existing_posts = {row.id for row in bind.execute(sa.select(posts.c.id))}
+    now = datetime.now(pytz.timezone("Asia/Almaty"))
+    rows = []
+    for user in bind.execute(sa.select(users.c.id, users.c.favorites)):
+        seen = set()
+        for part in (user.favorites or "").split(","):
+            part = part.strip()
+            if not part.isdigit():
+                continue
+            post_id = int(part)
+            if post_id in seen or post_id not in existing_posts:
+                continue
+            seen.add(post_id)
+            rows.append({"user_id": user.id, "post_id": post_id, "created_at": now})
+    if rows:
+        op.bulk_insert(user_favorites, rows)
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('favorites')
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('favorites', sa.String(), nullable=True))
+
+    bind = op.get_bind()
+    favorites = {}
+    query = sa.select(user_favorites.c.user_id, user_favorites.c.post_id).order_by(
+        user_favorites.c.user_id, user_favorites.c.created_at
+    )
+    for row in bind.execute(query):
+        favorites[row.user_id] = favorites.get(row.user_id, "") + f"{row.post_id}, "
+    for user_id, value in favorites.items():
+        bind.execute(users.update().where(users.c.id == user_id).values(favorites=value))
+
+    op.drop_index('ix_user_favorites_user_id_created_at', table_name='user_favorites')
+    op.drop_index(op.f('ix_user_favorites_post_id'), table_name='user_favorites')
+    op.drop_table('user_favorites')
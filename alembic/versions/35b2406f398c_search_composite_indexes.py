@@ -0,0 +1,38 @@
+"""search composite indexes
+
+Revision ID: 35b2406f398c
+Revises: f3b4764790b8
+Create Date: 2026-10-18 10:12:41.207315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '35b2406f398c'
+down_revision = 'f3b4764790b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Search filters: type + rooms_count equality, then a price range
+    op.create_index('ix_posts_type_rooms_count_price', 'posts', ['type', 'rooms_count', 'price'], unique=False)
+    op.create_index('ix_posts_type_price', 'posts', ['type', 'price'], unique=False)
+    op.create_index('ix_posts_price', 'posts', ['price'], unique=False)
+    # Duplicate check in create_post
+    op.create_index('ix_posts_user_id_address_price', 'posts', ['user_id', 'address', 'price'], unique=False)
+    # ix_posts_type is a prefix of the composite indexes above
+    op.drop_index('ix_posts_type', table_name='posts')
+    # Comment lookups and counts by post
+    op.create_index('ix_comments_post_id', 'comments', ['post_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_comments_post_id', table_name='comments')
+    op.create_index('ix_posts_type', 'posts', ['type'], unique=False)
+    op.drop_index('ix_posts_user_id_address_price', table_name='posts')
+    op.drop_index('ix_posts_price', table_name='posts')
+    op.drop_index('ix_posts_type_price', table_name='posts')
+    op.drop_index('ix_posts_type_rooms_count_price', table_name='posts')
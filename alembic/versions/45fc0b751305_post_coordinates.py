@@ -0,0 +1,36 @@
+"""post coordinates and spatial index
+
+Revision ID: 45fc0b751305
+Revises: 5d4c18a0d586
+Create Date: 2026-10-18 14:02:33.871925
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '45fc0b751305'
+down_revision = '5d4c18a0d586'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('posts', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('posts', sa.Column('longitude', sa.Float(), nullable=True))
+    op.create_index('ix_posts_latitude_longitude', 'posts', ['latitude', 'longitude'], unique=False)
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE posts_rtree "
+            "USING rtree(id, min_lat, max_lat, min_lon, max_lon)"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE posts_rtree")
+    op.drop_index('ix_posts_latitude_longitude', table_name='posts')
+    with op.batch_alter_table('posts') as batch_op:
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
@@ -0,0 +1,42 @@
+"""posts full-text search
+
+Revision ID: 5d4c18a0d586
+Revises: eedeef9746fb
+Create Date: 2026-10-18 13:20:45.118034
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d4c18a0d586'
+down_revision = 'eedeef9746fb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE posts_fts USING fts5("
+            "address, description, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        op.execute(
+            "INSERT INTO posts_fts (rowid, address, description) "
+            "SELECT id, address, description FROM posts"
+        )
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE INDEX ix_posts_fulltext ON posts "
+            "USING gin (to_tsvector('simple', address || ' ' || description))"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE posts_fts")
+    elif dialect == 'postgresql':
+        op.drop_index('ix_posts_fulltext', table_name='posts')
@@ -0,0 +1,27 @@
+"""comments (post_id, created_at, id) index for cursor pagination
+
+Revision ID: 9a7e3c1d2b4f
+Revises: 45fc0b751305
+Create Date: 2026-10-18 15:20:11.402318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a7e3c1d2b4f'
+down_revision = '45fc0b751305'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The composite index also serves plain post_id lookups
+    op.create_index('ix_comments_post_id_created_at_id', 'comments', ['post_id', 'created_at', 'id'], unique=False)
+    op.drop_index('ix_comments_post_id', table_name='comments')
+
+
+def downgrade():
+    op.create_index('ix_comments_post_id', 'comments', ['post_id'], unique=False)
+    op.drop_index('ix_comments_post_id_created_at_id', table_name='comments')
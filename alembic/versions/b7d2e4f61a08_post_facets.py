@@ -0,0 +1,46 @@
+"""post_facets table of pre-aggregated search facet counts
+
+Revision ID: b7d2e4f61a08
+Revises: 9a7e3c1d2b4f
+Create Date: 2026-10-18 17:05:42.118904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e4f61a08'
+down_revision = '9a7e3c1d2b4f'
+branch_labels = None
+depends_on = None
+
+# Lower edges of app.repositories.facets.PRICE_BUCKETS at the time of this revision
+PRICE_BUCKETS = (
+    0, 50_000, 100_000, 200_000, 300_000, 500_000, 1_000_000, 2_000_000,
+    5_000_000, 10_000_000, 20_000_000, 50_000_000, 100_000_000,
+)
+
+
+def upgrade():
+    op.create_table(
+        'post_facets',
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('rooms_count', sa.Integer(), nullable=False),
+        sa.Column('price_bucket', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('type', 'rooms_count', 'price_bucket'),
+    )
+    bucket = "CASE " + " ".join(
+        f"WHEN price >= {edge} THEN {index}"
+        for index, edge in reversed(list(enumerate(PRICE_BUCKETS)))
+    ) + " ELSE 0 END"
+    op.execute(
+        "INSERT INTO post_facets (type, rooms_count, price_bucket, count) "
+        f"SELECT type, rooms_count, {bucket}, count(*) FROM posts "
+        f"GROUP BY type, rooms_count, {bucket}"
+    )
+
+
+def downgrade():
+    op.drop_table('post_facets')
@@ -0,0 +1,58 @@
+"""post created_at and one (column, id) index per search sort order
+
+Revision ID: c4e8a2d9f713
+Revises: b7d2e4f61a08
+Create Date: 2026-10-18 19:42:07.530216
+
+"""
+from datetime import datetime
+from alembic import op
+import pytz
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a2d9f713'
+down_revision = 'b7d2e4f61a08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('posts', sa.Column('created_at', sa.DateTime(), nullable=True))
+    # Existing posts get the migration time; newest then orders them by id
+    posts = sa.table('posts', sa.column('created_at', sa.DateTime()))
+    op.execute(posts.update().values(
+        created_at=datetime.now(pytz.timezone("Asia/Almaty")).replace(tzinfo=None)
+    ))
+    with op.batch_alter_table('posts') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+    # Filter indexes end in id so price-sorted pages need no sort step
+    op.create_index('ix_posts_type_rooms_count_price_id', 'posts', ['type', 'rooms_count', 'price', 'id'], unique=False)
+    op.create_index('ix_posts_type_price_id', 'posts', ['type', 'price', 'id'], unique=False)
+    op.drop_index('ix_posts_type_rooms_count_price', table_name='posts')
+    op.drop_index('ix_posts_type_price', table_name='posts')
+    # One index per sort order; descending orders scan it backwards
+    op.create_index('ix_posts_price_id', 'posts', ['price', 'id'], unique=False)
+    op.drop_index('ix_posts_price', table_name='posts')
+    op.create_index('ix_posts_area_id', 'posts', ['area', 'id'], unique=False)
+    op.create_index('ix_posts_created_at_id', 'posts', ['created_at', 'id'], unique=False)
+    # Same orders within a type, the most common filter
+    op.create_index('ix_posts_type_area_id', 'posts', ['type', 'area', 'id'], unique=False)
+    op.create_index('ix_posts_type_created_at_id', 'posts', ['type', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_posts_type_created_at_id', table_name='posts')
+    op.drop_index('ix_posts_type_area_id', table_name='posts')
+    op.drop_index('ix_posts_created_at_id', table_name='posts')
+    op.drop_index('ix_posts_area_id', table_name='posts')
+    op.create_index('ix_posts_price', 'posts', ['price'], unique=False)
+    op.drop_index('ix_posts_price_id', table_name='posts')
+    op.create_index('ix_posts_type_price', 'posts', ['type', 'price'], unique=False)
+    op.create_index('ix_posts_type_rooms_count_price', 'posts', ['type', 'rooms_count', 'price'], unique=False)
+    op.drop_index('ix_posts_type_price_id', table_name='posts')
+    op.drop_index('ix_posts_type_rooms_count_price_id', table_name='posts')
+    with op.batch_alter_table('posts') as batch_op:
+        batch_op.drop_column('created_at')
@@ -0,0 +1,24 @@
+"""posts (rooms_count, price, id) index for searches by rooms without type
+
+Revision ID: d19b5f0c7e42
+Revises: c4e8a2d9f713
+Create Date: 2026-10-19 10:12:36.904512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd19b5f0c7e42'
+down_revision = 'c4e8a2d9f713'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_posts_rooms_count_price_id', 'posts', ['rooms_count', 'price', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_posts_rooms_count_price_id', table_name='posts')
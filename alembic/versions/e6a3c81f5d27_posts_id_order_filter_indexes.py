@@ -0,0 +1,28 @@
+"""posts (type, rooms_count, id), (rooms_count, id) and (type, id) indexes for id-ordered pages
+
+Revision ID: e6a3c81f5d27
+Revises: d19b5f0c7e42
+Create Date: 2026-10-20 09:41:18.220637
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6a3c81f5d27'
+down_revision = 'd19b5f0c7e42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_posts_type_rooms_count_id', 'posts', ['type', 'rooms_count', 'id'], unique=False)
+    op.create_index('ix_posts_rooms_count_id', 'posts', ['rooms_count', 'id'], unique=False)
+    op.create_index('ix_posts_type_id', 'posts', ['type', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_posts_type_id', table_name='posts')
+    op.drop_index('ix_posts_rooms_count_id', table_name='posts')
+    op.drop_index('ix_posts_type_rooms_count_id', table_name='posts')
@@ -0,0 +1,29 @@
+"""post comments_count
+
+Revision ID: eedeef9746fb
+Revises: 1c344cc73397
+Create Date: 2026-10-18 11:52:07.640193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'eedeef9746fb'
+down_revision = '1c344cc73397'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('posts', sa.Column('comments_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE posts SET comments_count = "
+        "(SELECT count(*) FROM comments WHERE comments.post_id = posts.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('posts') as batch_op:
+        batch_op.drop_column('comments_count')
@@ -1,16 +1,16 @@
-from fastapi import APIRouter, Depends, Response, HTTPException, Form, Request
+from fastapi import APIRouter, Depends, Response, HTTPException, Form, Request, Query
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from pydantic import EmailStr
 from datetime import timedelta
 from jose import JWTError, jwt, ExpiredSignatureError
-from ..repositories.users import UsersRepository
+from ..repositories.aio import AsyncUsersRepository
 from ..schemas.users import UserCreate, UserLogin, UserUpdate, UserInfo, FavoritesList
 from ..database.database import get_db
 from ..utils.security import (
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_and_update_password_async,
     decode_access_token,
     decode_refresh_token,
     create_access_token,
@@ -20,12 +20,12 @@ from ..utils.security import (
 )
 
 router = APIRouter()
-users_repository = UsersRepository()
+users_repository = AsyncUsersRepository()
 
 
 # Endpoint to refresh the access token
 @router.post("/refresh")
-def refresh(request: Request, db: Session = Depends(get_db)):
+async def refresh(request: Request, db: Session = Depends(get_db)):
     refresh_token = request.cookies.get("refresh_token")
     if not refresh_token:
         raise HTTPException(status_code=401, detail="Missing refresh token")
@@ -51,9 +51,9 @@ def refresh(request: Request, db: Session = Depends(get_db)):
 
 # Registration
 @router.post("/users")
-def post_signup(user_input: UserCreate, db: Session = Depends(get_db)):
-    user_input.password = hash_password(user_input.password)
-    new_user = users_repository.create_user(db, user_input)
+async def post_signup(user_input: UserCreate, db: Session = Depends(get_db)):
+    user_input.password = await hash_password_async(user_input.password)
+    new_user = await users_repository.create_user(db, user_input)
     return Response(
         status_code=201, content=f"Successful signup. User_id = {new_user.id}"
     )
@@ -61,19 +61,23 @@ def post_signup(user_input: UserCreate, db: Session = Depends(get_db)):
 
 # Login
 @router.post("/users/login")
-def post_login(
+async def post_login(
     username: EmailStr = Form(),
     password: str = Form(),
     db: Session = Depends(get_db),
 ):
     user_data = UserLogin(username=username, password=password)
-    user = users_repository.get_user_by_username(db, user_data)
-    if not verify_password(password, user.password):
+    user = await users_repository.get_user_by_username(db, user_data)
+    is_valid, new_hash = await verify_and_update_password_async(password, user.password)
+    if not is_valid:
         raise HTTPException(
             status_code=401,
             detail="Incorrect password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # Stored hash uses outdated settings (e.g. fewer bcrypt rounds)
+        await users_repository.update_user(db, user.id, UserUpdate(password=new_hash))
     access_token = create_access_token(user.id)
     refresh_token = create_refresh_token(user.id)
 
@@ -92,15 +96,15 @@ def post_login(
 
 # Update user
 @router.patch("/users/me")
-def patch_user(
+async def patch_user(
     user_input: UserUpdate,
     user_data: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     user_id = user_data["user_id"]
     if user_input.password:
-        user_input.password = hash_password(user_input.password)
-    users_repository.update_user(db, user_id, user_input)
+        user_input.password = await hash_password_async(user_input.password)
+    await users_repository.update_user(db, user_id, user_input)
     return {
         "message": "User updated successfully",
     }
@@ -108,11 +112,11 @@ def patch_user(
 
 # Get user info
 @router.get("/users/me", response_model=UserInfo)
-def get_user(
+async def get_user(
     user_data: dict = Depends(get_current_user), db: Session = Depends(get_db)
 ):
     user_id = user_data["user_id"]
-    user = users_repository.get_by_id(db, user_id)
+    user = await users_repository.get_by_id(db, user_id)
     user.phone = user.phone.replace("-", " ")
     response_data = UserInfo(
         id=user_id,
@@ -127,13 +131,13 @@ def get_user(
 
 # Add to favorites
 @router.post("/users/favorites/shanyraks/{id}")
-def add_to_favorites(
+async def add_to_favorites(
     id: int,
     user_data: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     user_id = user_data["user_id"]
-    users_repository.add_to_favorites(db, user_id, id)
+    await users_repository.add_to_favorites(db, user_id, id)
     return {
         "message": f"Post with id {id} added to favorites",
     }
@@ -141,21 +145,24 @@ def add_to_favorites(
 
 # Get favorites
 @router.get("/users/favorites/shanyraks", response_model=FavoritesList)
-def get_favorites(
-    user_data: dict = Depends(get_current_user), db: Session = Depends(get_db)
+async def get_favorites(
+    user_data: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=100, description="Number of favorites to return"),
+    offset: int = Query(0, ge=0, description="Number of favorites to skip"),
 ):
     user_id = user_data["user_id"]
-    shanyraks_list = users_repository.get_favorites(db, user_id)
+    shanyraks_list = await users_repository.get_favorites(db, user_id, limit, offset)
     return FavoritesList(shanyraks=shanyraks_list)
 
 
 # Delete from favorites
 @router.delete("/users/favorites/shanyraks/{id}")
-def delete_favorite(
+async def delete_favorite(
     id: int, user_data: dict = Depends(get_current_user), db: Session = Depends(get_db)
 ):
     user_id = user_data["user_id"]
-    users_repository.delete_from_favorites(db, user_id, id)
+    await users_repository.delete_from_favorites(db, user_id, id)
     return {
         "message": f"Post with id {id} deleted from favorites",
     }
@@ -1,75 +1,238 @@
 import enum
-from fastapi import APIRouter, Depends, Response, Query
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from pydantic import EmailStr
+from pydantic import EmailStr, ValidationError
 from typing import Optional
-from ..repositories.posts import PostRepository
+from ..repositories.aio import AsyncPostRepository, AsyncCommentRepository
 from ..schemas.posts import (
+    PostBatch,
     PostCreate,
     PostInfo,
     PostUpdate,
     SearchShanyrak,
     SearchShanyrakList,
 )
-from ..repositories.comments import CommentRepository
 from ..schemas.comments import CommentCreate, CommentInfo, CommentInfoList
-from ..database.database import get_db
+from ..database.database import get_db, SessionLocal
+from ..config import get_settings
 from ..utils.security import (
     get_current_user,
 )
+from ..utils import bulk, response_cache
 
 router = APIRouter()
-post_repository = PostRepository()
-comments_repository = CommentRepository()
+post_repository = AsyncPostRepository()
+comments_repository = AsyncCommentRepository()
+
+# Errors listed in an import report; the rest are only counted
+MAX_IMPORT_ERRORS = 100
+COMMENTS_PAGE_SIZE = 50
+MAX_BATCH_IDS = 100
+
 
 class PostType(str, enum.Enum):
     rent = "rent"
     buy = "buy"
 
 
+class TotalMode(str, enum.Enum):
+    estimate = "estimate"
+    exact = "exact"
+    none = "none"
+
+
+class SortOrder(str, enum.Enum):
+    price = "price"
+    price_desc = "-price"
+    area = "area"
+    area_desc = "-area"
+    newest = "newest"
+
+
+def parse_coordinates(value: str, name: str, size: int) -> tuple:
+    """Parse "lat,lon[,lat,lon]" query values into floats with range checks."""
+    try:
+        numbers = tuple(float(part) for part in value.split(","))
+    except ValueError:
+        numbers = ()
+    if len(numbers) != size or any(
+        abs(number) > (90 if i % 2 == 0 else 180) for i, number in enumerate(numbers)
+    ):
+        raise HTTPException(status_code=422, detail=f"Invalid {name} coordinates")
+    return numbers
+
+
 # Shanyraks
 
 # Create post (shanyrak)
 @router.post("/")
-def post_post(
+async def post_post(
     post_input: PostCreate,
     user_data: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     user_id = user_data["user_id"]
-    post_id = str(post_repository.create_post(db, user_id, post_input))
+    post_id = str(await post_repository.create_post(db, user_id, post_input))
     return {"id": post_id}
 
 
+# Bulk import (NDJSON or CSV body, see app.utils.bulk)
+@router.post("/import")
+async def import_posts(
+    request: Request,
+    user_data: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    content_type = request.headers.get("content-type", bulk.NDJSON).split(";")[0].strip()
+    if content_type not in bulk.FORMATS:
+        raise HTTPException(
+            status_code=415, detail="Expected application/x-ndjson or text/csv"
+        )
+    user_id = user_data["user_id"]
+    chunk_size = get_settings().import_chunk_size
+    inserted = duplicates = 0
+    errors = []
+    error_count = 0
+    chunk = []
+    async for row, record in bulk.iter_records(request.stream(), content_type):
+        if isinstance(record, ValueError):
+            detail = str(record)
+        else:
+            try:
+                chunk.append(PostCreate.model_validate(record))
+                detail = None
+            except ValidationError as e:
+                detail = e.errors(include_url=False, include_context=False, include_input=False)
+        if detail is not None:
+            error_count += 1
+            if len(errors) < MAX_IMPORT_ERRORS:
+                errors.append({"row": row, "detail": detail})
+            continue
+        if len(chunk) >= chunk_size:
+            added, skipped = await post_repository.import_posts(db, user_id, chunk)
+            inserted, duplicates, chunk = inserted + added, duplicates + skipped, []
+    if chunk:
+        added, skipped = await post_repository.import_posts(db, user_id, chunk)
+        inserted, duplicates = inserted + added, duplicates + skipped
+    return {
+        "inserted": inserted,
+        "duplicates": duplicates,
+        "error_count": error_count,
+        "errors": errors,
+    }
+
+
+def export_lines(*filters):
+    # The request's session is closed before the body is streamed, so the
+    # export opens its own and reads through the sync repository (in async
+    # mode DATABASE_URL names the same database, see check_database_urls)
+    batch_size = get_settings().export_batch_size
+    db = SessionLocal()
+    try:
+        lines = []
+        for post in post_repository.sync.iter_posts(db, *filters):
+            lines.append(json.dumps(post, ensure_ascii=False) + "\n")
+            if len(lines) >= batch_size:
+                yield "".join(lines)
+                lines = []
+        if lines:
+            yield "".join(lines)
+    finally:
+        db.close()
+
+
+# Bulk export of search results as NDJSON
+@router.get("/export")
+async def export_posts(
+    type: Optional[PostType] = Query(None, description="Post type (rent, buy, sale)"),
+    rooms_count: Optional[int] = Query(None, ge=0, description="Required number of rooms"),
+    price_from: int = Query(0, ge=0, description="Minimum price"),
+    price_until: Optional[int] = Query(None, ge=0, description="Maximum price"),
+    q: Optional[str] = Query(
+        None, max_length=200, description="Keywords in address or description"
+    ),
+    near: Optional[str] = Query(
+        None, description="Center point as lat,lon (requires radius_km)"
+    ),
+    radius_km: Optional[float] = Query(
+        None, gt=0, le=500, description="Search radius around `near` in kilometres"
+    ),
+    bbox: Optional[str] = Query(
+        None, description="Bounding box as min_lat,min_lon,max_lat,max_lon"
+    ),
+):
+    near_point = parse_coordinates(near, "near", 2) if near else None
+    if near_point is not None and radius_km is None:
+        raise HTTPException(status_code=422, detail="radius_km is required with near")
+    bbox_box = parse_coordinates(bbox, "bbox", 4) if bbox else None
+    return StreamingResponse(
+        export_lines(type, rooms_count, price_from, price_until, q, near_point, radius_km, bbox_box),
+        media_type=bulk.NDJSON,
+    )
+
+
+# Get several posts at once (declared before /{id} so "batch" is not an id)
+@router.get("/batch", response_model=PostBatch)
+async def get_posts_batch(
+    ids: str = Query(..., description=f"Comma-separated post ids, at most {MAX_BATCH_IDS}"),
+    db: Session = Depends(get_db),
+):
+    try:
+        post_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be comma-separated integers")
+    if not post_ids:
+        raise HTTPException(status_code=422, detail="ids must not be empty")
+    if len(post_ids) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=422, detail=f"At most {MAX_BATCH_IDS} ids per request"
+        )
+
+    found = await post_repository.get_posts_by_ids(db, post_ids)
+    posts = [
+        PostInfo.model_validate(found[post_id]).model_dump() if post_id in found else None
+        for post_id in post_ids
+    ]
+    missing = [post_id for post_id in post_ids if post_id not in found]
+    return ORJSONResponse({"posts": posts, "missing": missing})
+
+
 # Get post
 @router.get("/{id}", response_model=PostInfo)
-def get_post(id: int, db: Session = Depends(get_db)):
-    db_post, total_comments = post_repository.get_post_by_id(db, id)
-    return PostInfo(**db_post.__dict__, total_comments=total_comments)
+async def get_post(id: int, request: Request, db: Session = Depends(get_db)):
+    generation = response_cache.response_cache.generation()
+    entry = response_cache.response_cache.get(f"post:{id}")
+    if entry is None:
+        db_post = await post_repository.get_post_by_id(db, id)
+        post_info = PostInfo.model_validate(db_post)
+        entry = response_cache.store(f"post:{id}", post_info.model_dump_json(), generation)
+    return response_cache.respond(request, entry)
 
 
 # Update post
 @router.patch("/{id}")
-def update_post(
+async def update_post(
     id: int,
     post_input: PostUpdate,
     user_data: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     user_id = user_data["user_id"]
-    post_repository.update_post(db, id, user_id, post_input)
+    await post_repository.update_post(db, id, user_id, post_input)
     return Response(content=f"Post with id {id} updated", status_code=200)
 
 
 # Delete post
 @router.delete("/{id}")
-def delete_post(
+async def delete_post(
     id: int,
     user_data: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     user_id = user_data["user_id"]
-    post_repository.delete_post(db, id, user_id)
+    await post_repository.delete_post(db, id, user_id)
     return Response(content=f"Post with id {id} deleted", status_code=200)
 
 
@@ -77,39 +240,71 @@ def delete_post(
 
 # Create comment
 @router.post("/{id}/comments")
-def post_comment(
+async def post_comment(
     comment: CommentCreate,
     id: int,
     user_data: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     user_id = user_data["user_id"]
-    new_comment = comments_repository.create_comment(db, user_id, id, comment)
+    comment_id = await comments_repository.create_comment(db, user_id, id, comment)
     return Response(
         status_code=200,
-        content=f"Comment with id {new_comment.id} created for post with id {id}",
+        content=f"Comment with id {comment_id} created for post with id {id}",
     )
 
 
+def comment_lines(post_id: int):
+    # Same reasoning as export_lines: the request's session is already closed
+    batch_size = get_settings().export_batch_size
+    db = SessionLocal()
+    try:
+        lines = []
+        for comment in comments_repository.sync.iter_comments(db, post_id):
+            comment["created_at"] = comment["created_at"].isoformat()
+            lines.append(json.dumps(comment, ensure_ascii=False) + "\n")
+            if len(lines) >= batch_size:
+                yield "".join(lines)
+                lines = []
+        if lines:
+            yield "".join(lines)
+    finally:
+        db.close()
+
+
 # Get comments
 @router.get("/{id}/comments", response_model=CommentInfoList)
-def get_comment(id: int, db: Session = Depends(get_db)):
-    comments = comments_repository.get_comment_by_post_id(db, id)
-    comments_list = [
-        CommentInfo(
-            id=com.id,
-            content=com.content,
-            created_at=com.created_at,
-            author_id=com.author_id,
+async def get_comment(
+    id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    limit: int = Query(COMMENTS_PAGE_SIZE, ge=1, le=200, description="Comments per page"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page"),
+    stream: bool = Query(False, description="Stream every comment as NDJSON instead"),
+):
+    if stream:
+        await post_repository.get_post_by_id(db, id)
+        return StreamingResponse(comment_lines(id), media_type=bulk.NDJSON)
+
+    # Only the default first page is cached; comments_changed drops it
+    cacheable = cursor is None and limit == COMMENTS_PAGE_SIZE
+    generation = response_cache.response_cache.generation()
+    entry = response_cache.response_cache.get(f"comments:{id}") if cacheable else None
+    if entry is None:
+        comments, next_cursor = await comments_repository.get_comment_by_post_id(
+            db, id, limit, cursor
         )
-        for com in comments
-    ]
-    return CommentInfoList(comments=comments_list)
+        comments_list = [CommentInfo.model_validate(com) for com in comments]
+        body = CommentInfoList(comments=comments_list, next_cursor=next_cursor).model_dump_json()
+        if not cacheable:
+            return Response(content=body, media_type="application/json")
+        entry = response_cache.store(f"comments:{id}", body, generation)
+    return response_cache.respond(request, entry)
 
 
 # Update comment
 @router.patch("/{id}/comments/{comment_id}")
-def patch_comment(
+async def patch_comment(
     content: str,
     id: int,
     comment_id: int,
@@ -117,7 +312,7 @@ def patch_comment(
     db: Session = Depends(get_db),
 ):
     user_id = user_data["user_id"]
-    comments_repository.update_comment(db, user_id, id, comment_id, content)
+    await comments_repository.update_comment(db, user_id, id, comment_id, content)
     return Response(
         status_code=200,
         content=f"Comment with id {comment_id} on post {id} updated",
@@ -126,14 +321,14 @@ def patch_comment(
 
 # Delete comment
 @router.delete("/{id}/comments/{comment_id}")
-def delete_comment(
+async def delete_comment(
     id: int,
     comment_id: int,
     user_data: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     user_id = user_data["user_id"]
-    comments_repository.delete_comment(db, user_id, id, comment_id)
+    await comments_repository.delete_comment(db, user_id, id, comment_id)
     return Response(
         status_code=200,
         content=f"Comment with id {comment_id} on post {id} deleted",
@@ -142,17 +337,64 @@ def delete_comment(
 
 # Search & Pagination
 @router.get("/", response_model=SearchShanyrakList)
-def search_posts(
+async def search_posts(
     db: Session = Depends(get_db),
     limit: int = Query(5, ge=1, description="Number of posts to return"),
     offset: int = Query(0, ge=0, description="Number of posts to skip"),
+    cursor: Optional[str] = Query(
+        None, description="Cursor from a previous page (takes precedence over offset)"
+    ),
     type: Optional[PostType] = Query(None, description="Post type (rent, buy, sale)"),
     rooms_count: Optional[int] = Query(None, ge=0, description="Required number of rooms"),
     price_from: int = Query(0, ge=0, description="Minimum price"),
     price_until: Optional[int] = Query(None, ge=0, description="Maximum price"),
+    total: TotalMode = Query(
+        TotalMode.estimate,
+        description="Total count: cached estimate, exact recount, or none to skip",
+    ),
+    q: Optional[str] = Query(
+        None, max_length=200,
+        description="Keywords in address or description, ranked by relevance",
+    ),
+    near: Optional[str] = Query(
+        None, description="Center point as lat,lon (requires radius_km)"
+    ),
+    radius_km: Optional[float] = Query(
+        None, gt=0, le=500, description="Search radius around `near` in kilometres"
+    ),
+    bbox: Optional[str] = Query(
+        None, description="Bounding box as min_lat,min_lon,max_lat,max_lon"
+    ),
+    facets: bool = Query(
+        False,
+        description="Include type, rooms_count and price bucket counts "
+        "(not available with q, near or bbox)",
+    ),
+    sort: Optional[SortOrder] = Query(
+        None, description="Result order; by id when omitted, by relevance with q"
+    ),
 ):
-    posts, total_count = post_repository.get_posts(
-        db, limit, offset, type, rooms_count, price_from, price_until
+    near_point = parse_coordinates(near, "near", 2) if near else None
+    if near_point is not None and radius_km is None:
+        raise HTTPException(status_code=422, detail="radius_km is required with near")
+    bbox_box = parse_coordinates(bbox, "bbox", 4) if bbox else None
+
+    search_facets = None
+    if facets and not (q or near_point or bbox_box):
+        # Keyword and spatial filters are not part of the pre-aggregated facets
+        search_facets = await post_repository.get_facets(
+            db, type, rooms_count, price_from, price_until
+        )
+    posts, total_count, next_cursor = await post_repository.get_posts(
+        db, limit, offset, type, rooms_count, price_from, price_until, cursor,
+        total.value, q, near_point, radius_km, bbox_box, sort.value if sort else None,
     )
-    posts_list_formatted = [SearchShanyrak.model_validate(post.__dict__) for post in posts]
-    return SearchShanyrakList(total=total_count, objects=posts_list_formatted)
+    # Rows are validated once here; returning a Response skips FastAPI's
+    # second pass through response_model, which only documents the shape
+    posts_list_formatted = [SearchShanyrak.model_validate(post).model_dump() for post in posts]
+    return ORJSONResponse({
+        "total": total_count,
+        "objects": posts_list_formatted,
+        "next_cursor": next_cursor,
+        "facets": search_facets,
+    })
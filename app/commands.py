@@ -0,0 +1,74 @@
+"""Maintenance commands.
+
+Usage:
+    python -m app.commands recount-comments
+    python -m app.commands rebuild-search-index
+    python -m app.commands rebuild-geo-index
+    python -m app.commands rebuild-facets
+"""
+import argparse
+
+from app.database.database import SessionLocal, check_database_urls
+from app.repositories.posts import PostRepository
+
+
+def recount_comments(args):
+    db = SessionLocal()
+    try:
+        fixed = PostRepository().recount_comments(db)
+    finally:
+        db.close()
+    print(f"Fixed comments_count on {fixed} post(s)")
+
+
+def rebuild_search_index(args):
+    db = SessionLocal()
+    try:
+        indexed = PostRepository().rebuild_search_index(db)
+    finally:
+        db.close()
+    print(f"Indexed {indexed} post(s) for full-text search")
+
+
+def rebuild_geo_index(args):
+    db = SessionLocal()
+    try:
+        indexed = PostRepository().rebuild_geo_index(db)
+    finally:
+        db.close()
+    print(f"Indexed {indexed} geocoded post(s) for radius search")
+
+
+def rebuild_facets(args):
+    db = SessionLocal()
+    try:
+        rows = PostRepository().rebuild_facets(db)
+    finally:
+        db.close()
+    print(f"Rebuilt {rows} search facet row(s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser(
+        "recount-comments", help="Repair drifted posts.comments_count values"
+    ).set_defaults(func=recount_comments)
+    subparsers.add_parser(
+        "rebuild-search-index", help="Repopulate the full-text search index"
+    ).set_defaults(func=rebuild_search_index)
+    subparsers.add_parser(
+        "rebuild-geo-index", help="Repopulate the spatial (R*Tree) index"
+    ).set_defaults(func=rebuild_geo_index)
+    subparsers.add_parser(
+        "rebuild-facets", help="Recompute the pre-aggregated search facet counts"
+    ).set_defaults(func=rebuild_facets)
+
+    args = parser.parse_args(argv)
+    check_database_urls()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
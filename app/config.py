@@ -1,22 +1,121 @@
+"""Application settings.
+
+Settings are read from the environment (and the project's .env file) by the
+first `get_settings()` call, not when this module is imported. Call it where
+a setting is used: inside the function that needs it, or where a module-level
+object such as the database engine is built (which, for the app, happens
+when app.database is imported).
+"""
 import os
-from dotenv import load_dotenv
+from dataclasses import dataclass, fields
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
+
+ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
+
+
+def _bool(value: str) -> bool:
+    return value.lower() == "true"
+
+
+@dataclass(frozen=True)
+class Settings:
+    # JWT Settings
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = 15
+    refresh_token_expire_days: int = 7
+    secret_key: Optional[str] = None
+    refresh_secret_key: Optional[str] = None
+    token_cache_max_entries: int = 10000
+
+    # Password hashing
+    bcrypt_rounds: int = 12
+    # "thread" or "process"; a process pool lets hashing run outside the GIL
+    password_hash_executor: str = "thread"
+    password_hash_workers: int = 2
+
+    # Database settings
+    # "sync" runs repositories on the threadpool, "async" on an AsyncEngine
+    database_backend: str = "sync"
+    database_url: str = "sqlite:///./sql_app.db"
+    async_database_url: str = "sqlite+aiosqlite:///./sql_app.db"
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_pre_ping: bool = True
+    database_pool_recycle: int = 1800
+
+    # SQLite connection tuning, applied to every new connection
+    sqlite_wal: bool = True
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size: int = -64000  # negative = KiB
+
+    # SQL instrumentation: statements slower than this are logged (0 logs all)
+    slow_query_ms: float = 200
+    server_timing: bool = True
+
+    # Search settings
+    # CSV of name,latitude,longitude used to geocode addresses offline
+    gazetteer_path: Optional[str] = None
+    count_cache_ttl_seconds: float = 30
+    count_cache_max_entries: int = 1024
+    # "sql", or "memory" to answer type/rooms/price filters from the
+    # in-process index in app.repositories.listing_index
+    search_engine: str = "sql"
+    listing_index_max_age_seconds: float = 300
+
+    # Bulk import/export
+    import_chunk_size: int = 500
+    export_batch_size: int = 1000
+
+    # Response cache for listing detail and comment lists: "none", "redis" or
+    # "memory" (single worker only, see app.utils.response_cache)
+    response_cache_backend: str = "none"
+    response_cache_url: str = "redis://localhost:6379/0"
+    response_cache_ttl_seconds: int = 300
+    response_cache_max_entries: int = 10000
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        values = {}
+        for field in fields(cls):
+            raw = os.getenv(field.name.upper())
+            if raw is None:
+                continue
+            if field.type is bool:
+                values[field.name] = _bool(raw)
+            elif field.type is int:
+                values[field.name] = int(raw)
+            elif field.type is float:
+                values[field.name] = float(raw)
+            else:
+                values[field.name] = raw
+        return cls(**values)
 
-# Load environment variables from .env file
-env_path = Path(__file__).resolve().parents[1] / '.env'
-print(f"Loading environment variables from: {env_path}")
+    def __post_init__(self):
+        if self.password_hash_executor not in ("thread", "process"):
+            raise ValueError("PASSWORD_HASH_EXECUTOR must be either 'thread' or 'process'.")
+        if self.response_cache_backend not in ("memory", "redis", "none"):
+            raise ValueError("RESPONSE_CACHE_BACKEND must be 'memory', 'redis' or 'none'.")
+        if self.search_engine not in ("sql", "memory"):
+            raise ValueError("SEARCH_ENGINE must be either 'sql' or 'memory'.")
+        if self.database_backend not in ("sync", "async"):
+            raise ValueError("DATABASE_BACKEND must be either 'sync' or 'async'.")
 
-load_dotenv(dotenv_path=env_path)
+    def require_secrets(self):
+        """Fail unless the JWT secrets are configured (checked at app startup)."""
+        if not self.secret_key:
+            raise ValueError("SECRET_KEY is not set in the environment variables.")
+        if not self.refresh_secret_key:
+            raise ValueError("REFRESH_SECRET_KEY is not set in the environment variables.")
 
-# JWT Settings
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
-REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
-SECRET_KEY = os.getenv("SECRET_KEY")
-REFRESH_SECRET_KEY = os.getenv("REFRESH_SECRET_KEY")
 
-if not SECRET_KEY:
-    raise ValueError("SECRET_KEY is not set in the environment variables.")
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    # Imported here so that importing app.config has no cost or side effects
+    from dotenv import load_dotenv
 
-if not REFRESH_SECRET_KEY:
-    raise ValueError("REFRESH_SECRET_KEY is not set in the environment variables.")
\ No newline at end of file
+    # Load environment variables from .env file
+    load_dotenv(dotenv_path=ENV_PATH)
+    return Settings.from_env()
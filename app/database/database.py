@@ -1,20 +1,143 @@
+import os
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+from ..config import get_settings
+from ..utils.geocoding import haversine_km
+from ..utils.instrumentation import instrument_engine
+from ..utils.metrics import instrument_pool, timed_pool_class
 
 Base = declarative_base()
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
+SQLALCHEMY_DATABASE_URL = get_settings().database_url
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+
+def engine_options(url: str) -> dict:
+    """Pool and driver options for create_engine/create_async_engine."""
+    settings = get_settings()
+    url = make_url(url)
+    is_async = url.get_dialect().is_async
+    # Queue pools time how long checkouts wait (see app.utils.metrics)
+    poolclass = timed_pool_class(
+        AsyncAdaptedQueuePool if is_async else QueuePool, "async" if is_async else "sync"
+    )
+    if url.get_backend_name() != "sqlite":
+        return {
+            "poolclass": poolclass,
+            "pool_size": settings.database_pool_size,
+            "max_overflow": settings.database_max_overflow,
+            "pool_pre_ping": settings.database_pool_pre_ping,
+            "pool_recycle": settings.database_pool_recycle,
+        }
+    options = {"connect_args": {"check_same_thread": False}}
+    if url.database not in (None, "", ":memory:"):
+        # In-memory databases use a single-connection pool without sizing
+        options["poolclass"] = poolclass
+        options["pool_size"] = settings.database_pool_size
+        options["max_overflow"] = settings.database_max_overflow
+    return options
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune a new SQLite connection and register the app's SQL functions.
+
+    WAL lets readers proceed alongside a writer, and busy_timeout makes
+    writers wait instead of failing on locks.
+    """
+    settings = get_settings()
+    cursor = dbapi_connection.cursor()
+    if settings.sqlite_wal:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+    cursor.execute(f"PRAGMA cache_size={settings.sqlite_cache_size}")
+    cursor.close()
+    # Exact distance check for radius search (see app.repositories.geo)
+    dbapi_connection.create_function("distance_km", 4, haversine_km, deterministic=True)
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", set_sqlite_pragmas)
+instrument_engine(engine)
+instrument_pool("sync", engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+if get_settings().database_backend == "async":
+    # Imported lazily so the sync backend does not need an async driver
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_url = get_settings().async_database_url
+    async_engine = create_async_engine(async_url, **engine_options(async_url))
+    if async_engine.dialect.name == "sqlite":
+        event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+    instrument_engine(async_engine.sync_engine)
+    instrument_pool("async", async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+def _database_identity(url) -> tuple:
+    url = make_url(url)
+    database = url.database
+    if url.get_backend_name() == "sqlite":
+        if database in (None, "", ":memory:"):
+            return None  # every connection gets its own in-memory database
+        database = os.path.abspath(database)
+    return url.get_backend_name(), url.username, url.host, url.port, database
+
+
+def same_database(url, other_url) -> bool:
+    """Whether two URLs name the same database, whatever their drivers."""
+    identity = _database_identity(url)
+    return identity is not None and identity == _database_identity(other_url)
+
+
+def check_database_urls():
+    """Fail when the async backend and the sync engine would use different databases.
+
+    Streaming exports, the listing index and the maintenance commands always
+    use SessionLocal, so with DATABASE_BACKEND=async DATABASE_URL must name
+    the database of ASYNC_DATABASE_URL with a sync driver (checked at startup).
+    """
+    if async_engine is not None and not same_database(engine.url, async_engine.url):
+        raise ValueError(
+            "DATABASE_URL and ASYNC_DATABASE_URL must point at the same database "
+            "when DATABASE_BACKEND is 'async'."
+        )
+
+
+async def get_db():
+    """Yield a Session, or an AsyncSession when the async backend is enabled.
+
+    Repositories are awaited through app.repositories.aio, which accepts both.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
 
-def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await run_in_threadpool(db.close)
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """Run a sync repository call without blocking the event loop.
+
+    With an AsyncSession the call runs through `run_sync`, which drives the
+    async driver from the sync code without a thread. With a Session it runs
+    on the threadpool, which is what a sync route did before.
+    """
+    if AsyncSessionLocal is not None:
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
@@ -1,5 +1,6 @@
 import enum
 from sqlalchemy import (
+    DDL,
     Column,
     Integer,
     String,
@@ -7,7 +8,9 @@ from sqlalchemy import (
     ForeignKey,
     Text,
     DateTime,
+    Index,
     Enum as SQLAlchemyEnum,
+    event,
 )
 from .database import Base
 from sqlalchemy.orm import relationship
@@ -29,10 +32,12 @@ class User(Base):
     password = Column(String, nullable=False)
     name = Column(String, nullable=False)
     city = Column(String, nullable=False)
-    favorites = Column(String, nullable=True)
 
     posts = relationship("Post", back_populates="user")
     comments = relationship("Comment", back_populates="user")
+    favorites = relationship(
+        "Favorite", back_populates="user", cascade="all, delete-orphan"
+    )
 
 
 class Post(Base):
@@ -40,15 +45,72 @@ class Post(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    type = Column(SQLAlchemyEnum(PostType), index=True, nullable=False)
+    type = Column(SQLAlchemyEnum(PostType), nullable=False)
     price = Column(Integer, nullable=False)
     address = Column(String, index=True, nullable=False)
     area = Column(Float, nullable=False)
     rooms_count = Column(Integer, nullable=False)
     description = Column(Text, nullable=False)
+    comments_count = Column(Integer, nullable=False, default=0, server_default="0")
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    created_at = Column(
+        DateTime,
+        default=lambda: datetime.now(pytz.timezone("Asia/Almaty")),
+        nullable=False,
+    )
 
     user = relationship("User", back_populates="posts")
     comments = relationship("Comment", back_populates="post")
+    favorited_by = relationship(
+        "Favorite", back_populates="post", cascade="all, delete-orphan"
+    )
+
+    __table_args__ = (
+        # Filter indexes end in id so price-sorted pages need no sort step
+        Index("ix_posts_type_rooms_count_price_id", "type", "rooms_count", "price", "id"),
+        Index("ix_posts_type_price_id", "type", "price", "id"),
+        Index("ix_posts_rooms_count_price_id", "rooms_count", "price", "id"),
+        # Equality filters in id order, so an unsorted filtered page seeks
+        # past the cursor and stops at LIMIT instead of sorting every match
+        Index("ix_posts_type_rooms_count_id", "type", "rooms_count", "id"),
+        Index("ix_posts_rooms_count_id", "rooms_count", "id"),
+        Index("ix_posts_type_id", "type", "id"),
+        # One (column, id) index per search sort order, scanned in either direction
+        Index("ix_posts_price_id", "price", "id"),
+        Index("ix_posts_area_id", "area", "id"),
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        # Same orders within a type, the most common filter
+        Index("ix_posts_type_area_id", "type", "area", "id"),
+        Index("ix_posts_type_created_at_id", "type", "created_at", "id"),
+        Index("ix_posts_user_id_address_price", "user_id", "address", "price"),
+        Index("ix_posts_latitude_longitude", "latitude", "longitude"),
+    )
+
+
+# Full-text search (app.repositories.fulltext): an FTS5 table on SQLite, an
+# expression GIN index on Postgres. Registered with the model so create_all()
+# matches the migration whether or not the repository has been imported.
+POSTS_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5("
+    "address, description, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+POSTS_TSVECTOR_INDEX_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_posts_fulltext ON posts "
+    "USING gin (to_tsvector('simple', address || ' ' || description))"
+)
+event.listen(Post.__table__, "after_create", DDL(POSTS_FTS_DDL).execute_if(dialect="sqlite"))
+event.listen(
+    Post.__table__, "after_create", DDL(POSTS_TSVECTOR_INDEX_DDL).execute_if(dialect="postgresql")
+)
+
+# Spatial index (app.repositories.geo): an R*Tree of post coordinates on
+# SQLite; other databases use ix_posts_latitude_longitude
+POSTS_RTREE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_rtree "
+    "USING rtree(id, min_lat, max_lat, min_lon, max_lon)"
+)
+event.listen(Post.__table__, "after_create", DDL(POSTS_RTREE_DDL).execute_if(dialect="sqlite"))
 
 
 class Comment(Base):
@@ -56,9 +118,51 @@ class Comment(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=datetime.now(pytz.timezone("Asia/Almaty")))
+    # Evaluated per row; a plain datetime.now(...) here is fixed at import time
+    created_at = Column(DateTime, default=lambda: datetime.now(pytz.timezone("Asia/Almaty")))
     author_id = Column(Integer, ForeignKey("users.id"))
     post_id = Column(Integer, ForeignKey("posts.id"))
 
     user = relationship("User", back_populates="comments")
     post = relationship("Post", back_populates="comments")
+
+    __table_args__ = (
+        # Comment pages seek on (created_at, id) within a post
+        Index("ix_comments_post_id_created_at_id", "post_id", "created_at", "id"),
+    )
+
+
+class Favorite(Base):
+    __tablename__ = "user_favorites"
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    post_id = Column(
+        Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+    created_at = Column(
+        DateTime,
+        default=lambda: datetime.now(pytz.timezone("Asia/Almaty")),
+        nullable=False,
+    )
+
+    user = relationship("User", back_populates="favorites")
+    post = relationship("Post", back_populates="favorited_by")
+
+    __table_args__ = (
+        Index(
+            "ix_user_favorites_user_id_created_at", "user_id", "created_at", "post_id"
+        ),
+    )
+
+
+class PostFacet(Base):
+    """Post counts per (type, rooms_count, price bucket), see app.repositories.facets."""
+
+    __tablename__ = "post_facets"
+
+    type = Column(SQLAlchemyEnum(PostType), primary_key=True)
+    rooms_count = Column(Integer, primary_key=True)
+    price_bucket = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
@@ -1,12 +1,39 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 from app.api import auth
 from app.api import shanyraks
+from app.api import metrics
+from app.config import get_settings
+from app.database.database import check_database_urls
+from app.utils.instrumentation import SQLInstrumentationMiddleware
+from app.utils.metrics import MetricsMiddleware
 from app.utils.middleware import RefreshTokenMiddleware
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Refuse to serve without JWT secrets or with the sync and async engines on
+    # different databases; importing the app does not check them
+    get_settings().require_secrets()
+    check_database_urls()
+    if get_settings().search_engine == "memory":
+        from app.repositories.listing_index import listing_index
+
+        # Searches fall back to SQL until the index is loaded
+        await run_in_threadpool(listing_index.rebuild)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(RefreshTokenMiddleware)
+# Each add_middleware wraps the previous ones, so SQL stats and metrics
+# cover the whole request, token refresh included
+app.add_middleware(SQLInstrumentationMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(shanyraks.router, prefix="/shanyraks", tags=["shanyraks"])
+app.include_router(metrics.router, tags=["metrics"])
 
 
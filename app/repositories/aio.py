@@ -0,0 +1,92 @@
+from sqlalchemy.orm import Session
+from ..config import get_settings
+from ..database.database import run_db
+from .comments import CommentRepository
+from .posts import PostRepository, count_cache
+from .users import UsersRepository
+
+
+class AsyncRepository:
+    """Awaitable facade over a sync repository.
+
+    Every public method takes the session as its first argument, so
+    `await repo.method(db, ...)` runs `method` through `run_db` on either a
+    Session or an AsyncSession and the query logic lives in one place.
+
+    Reads on the request hot paths (search, post lookups, comment pages)
+    are overridden below: the sync repository builds the statements and
+    they are awaited on the AsyncSession, because a `run_sync` round trip
+    per call made the async backend slower than the sync one.
+    """
+
+    repository_class = None
+
+    def __init__(self):
+        self.sync = self.repository_class()
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        method = getattr(self.sync, name)
+
+        async def call(db, *args, **kwargs):
+            return await run_db(db, method, *args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+
+class AsyncUsersRepository(AsyncRepository):
+    repository_class = UsersRepository
+
+
+class AsyncPostRepository(AsyncRepository):
+    repository_class = PostRepository
+
+    async def get_post_by_id(self, db, post_id: int):
+        if isinstance(db, Session):
+            return await run_db(db, self.sync.get_post_by_id, post_id)
+        return self.sync._found((await db.execute(self.sync._post_statement(post_id))).first())
+
+    async def get_posts_by_ids(self, db, post_ids):
+        if isinstance(db, Session) or not post_ids:
+            return await run_db(db, self.sync.get_posts_by_ids, post_ids)
+        rows = await db.execute(self.sync._posts_statement(post_ids))
+        return {row.id: row for row in rows}
+
+    async def get_posts(
+        self, db, limit, offset, type, rooms_count, price_from, price_until,
+        cursor=None, total="estimate", q=None, near=None, radius_km=None, bbox=None,
+        sort=None,
+    ):
+        filters = (limit, offset, type, rooms_count, price_from, price_until, cursor)
+        if isinstance(db, Session) or get_settings().search_engine == "memory":
+            # The listing index is read in process, so it stays on the sync path
+            return await run_db(
+                db, self.sync.get_posts, *filters, total, q, near, radius_km, bbox, sort
+            )
+        generation = count_cache.generation()
+        # sync_session only builds the statements here; nothing runs on it
+        page, count, filters_key, sort_column = self.sync._search_statements(
+            db.sync_session, *filters, q, near, radius_km, bbox, sort
+        )
+        total_count = self.sync._cached_count(filters_key, total)
+        if total_count is None and total != "none":
+            total_count = await db.scalar(count)
+            self.sync._store_count(filters_key, total_count, generation)
+        db_posts, next_cursor = self.sync._page(
+            (await db.execute(page)).all(), limit, sort_column
+        )
+        return db_posts, total_count, next_cursor
+
+
+class AsyncCommentRepository(AsyncRepository):
+    repository_class = CommentRepository
+
+    async def get_comment_by_post_id(self, db, post_id: int, limit: int, cursor=None):
+        if isinstance(db, Session):
+            return await run_db(db, self.sync.get_comment_by_post_id, post_id, limit, cursor)
+        comments = (await db.execute(self.sync._page_statement(post_id, limit, cursor))).all()
+        if not comments and cursor is None:
+            self.sync._found((await db.execute(self.sync._post_statement(post_id))).first())
+        return self.sync._page(comments, limit)
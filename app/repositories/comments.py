@@ -1,8 +1,17 @@
+import pytz
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
 from fastapi import HTTPException
+from sqlalchemy import and_, delete, insert, literal, or_, select, tuple_, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from ..config import get_settings
 from ..database.models import Comment, Post, User
 from ..schemas.comments import CommentCreate
+from ..utils import events
+from ..utils.pagination import encode_cursor, decode_cursor
+
+COMMENT_COLUMNS = (Comment.id, Comment.content, Comment.created_at, Comment.author_id)
 
 
 class CommentRepository:
@@ -11,41 +20,99 @@ class CommentRepository:
         user_id: int,
         post_id: int,
         comment_data: CommentCreate
-    ):
+    ) -> int:
         try:
-            db_user = db.query(User).filter(User.id == user_id).first()
-            db_post = db.query(Post).filter(Post.id == post_id).first()
-
+            # Bumping the counter doubles as the post existence check
+            db_post = db.execute(
+                update(Post)
+                .where(Post.id == post_id)
+                .values(comments_count=Post.comments_count + 1)
+                .returning(Post.id)
+            ).first()
             if not db_post:
                 raise HTTPException(status_code=404, detail="Post not found")
-            if not db_user:
-                raise HTTPException(status_code=404, detail="User not found")
 
-            new_comment = Comment(
-                content=comment_data.content,
-                author_id=user_id,
-                post_id=post_id,
-            )
-
-            db.add(new_comment)
+            # INSERT ... SELECT FROM users inserts nothing for an unknown user
+            comment_id = db.execute(
+                insert(Comment)
+                .from_select(
+                    ["content", "author_id", "post_id", "created_at"],
+                    select(
+                        literal(comment_data.content), User.id, literal(post_id),
+                        literal(datetime.now(pytz.timezone("Asia/Almaty"))),
+                    ).where(User.id == user_id),
+                )
+                .returning(Comment.id)
+            ).scalar()
+            if comment_id is None:
+                raise HTTPException(status_code=404, detail="User not found")
             db.commit()
-            db.refresh(new_comment)
 
+        except HTTPException:
+            db.rollback()
+            raise
         except IntegrityError:
             db.rollback()
             raise HTTPException(status_code=400, detail="Integrity error")
 
-        return new_comment
+        events.publish("comments_changed", post_id=post_id)
+        return comment_id
 
     def get_comment_by_post_id(
-        self, db: Session, post_id: int
-    ) -> list[Comment]:
-        post = db.query(Post).filter(Post.id == post_id).first()
-        if not post:
+        self, db: Session, post_id: int, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[list, Optional[str]]:
+        """Return one page of a post's comments, oldest first, and the next cursor.
+
+        Pages seek past the last (created_at, id) through the
+        (post_id, created_at, id) index, so deep pages cost the same as the first.
+        """
+        comments = db.execute(self._page_statement(post_id, limit, cursor)).all()
+        if not comments and cursor is None:
+            # Only an empty first page needs to tell "no comments" from "no post"
+            self._found(db.execute(self._post_statement(post_id)).first())
+        return self._page(comments, limit)
+
+    def _page_statement(self, post_id: int, limit: int, cursor: Optional[str]):
+        query = select(*COMMENT_COLUMNS).where(Comment.post_id == post_id)
+        if cursor is not None:
+            created_at, last_id = decode_cursor(cursor, 2)
+            try:
+                created_at = datetime.fromisoformat(created_at)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            if not isinstance(last_id, int):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            query = query.where(
+                tuple_(Comment.created_at, Comment.id) > tuple_(created_at, last_id)
+            )
+        # Fetch one extra row to know whether there is a next page
+        return query.order_by(Comment.created_at, Comment.id).limit(limit + 1)
+
+    def _post_statement(self, post_id: int):
+        return select(Post.id).where(Post.id == post_id)
+
+    def _found(self, db_post):
+        if db_post is None:
             raise HTTPException(status_code=404, detail="Not found such Post")
 
-        comments = db.query(Comment).filter(Comment.post_id == post_id).all()
-        return comments
+    def _page(self, comments: list, limit: int) -> Tuple[list, Optional[str]]:
+        next_cursor = None
+        if len(comments) > limit:
+            comments = comments[:limit]
+            last = comments[-1]
+            next_cursor = encode_cursor(last.created_at.isoformat(), last.id)
+        return comments, next_cursor
+
+    def iter_comments(self, db: Session, post_id: int) -> Iterator[dict]:
+        """Yield all comments of a post, oldest first, from a server-side cursor."""
+        rows = db.execute(
+            select(*COMMENT_COLUMNS)
+            .where(Comment.post_id == post_id)
+            .order_by(Comment.created_at, Comment.id)
+            .execution_options(stream_results=True, yield_per=get_settings().export_batch_size)
+        )
+        for row in rows:
+            yield row._asdict()
 
     def update_comment(
         self,
@@ -55,32 +122,27 @@ class CommentRepository:
         comment_id: int,
         content: str,
     ):
-        db_user = db.query(User).filter(User.id == user_id).first()
-        if not db_user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        db_post = db.query(Post).filter(Post.id == post_id).first()
-        if not db_post:
-            raise HTTPException(status_code=404, detail="Post not found")
-
-        db_comment = (
-            db.query(Comment)
-            .filter(Comment.id == comment_id, Comment.post_id == post_id)
-            .first()
-        )
-        if not db_comment:
-            raise HTTPException(status_code=404, detail="Comment not found")
-
-        if db_comment.author_id != user_id:
-            raise HTTPException(status_code=403, detail="Forbidden")
-
-        db_comment.content = content
         try:
+            updated = db.execute(
+                update(Comment)
+                .where(
+                    Comment.id == comment_id,
+                    Comment.post_id == post_id,
+                    Comment.author_id == user_id,
+                )
+                .values(content=content)
+                .returning(Comment.id)
+            ).first()
+            if not updated:
+                self._raise_write_error(db, post_id, comment_id)
             db.commit()
-            db.refresh(db_comment)
+        except HTTPException:
+            db.rollback()
+            raise
         except Exception as e:
             db.rollback()
             raise HTTPException(status_code=500, detail=str(e))
+        events.publish("comments_changed", post_id=post_id)
 
     def delete_comment(
         self,
@@ -89,28 +151,47 @@ class CommentRepository:
         post_id: int,
         comment_id: int,
     ):
-        db_user = db.query(User).filter(User.id == user_id).first()
-        if not db_user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        db_post = db.query(Post).filter(Post.id == post_id).first()
-        if not db_post:
-            raise HTTPException(status_code=404, detail="Post not found")
-
-        db_comment = (
-            db.query(Comment)
-            .filter(Comment.id == comment_id, Comment.post_id == post_id)
-            .first()
-        )
-        if not db_comment:
-            raise HTTPException(status_code=404, detail="Comment not found")
-
-        if db_comment.author_id != user_id and db_post.user_id != user_id:
-            raise HTTPException(status_code=403, detail="Forbidden")
-
         try:
-            db.delete(db_comment)
+            # The author or the post's owner may delete a comment
+            owns_post = (
+                select(Post.id).where(Post.id == post_id, Post.user_id == user_id).exists()
+            )
+            deleted = db.execute(
+                delete(Comment)
+                .where(
+                    Comment.id == comment_id,
+                    Comment.post_id == post_id,
+                    or_(Comment.author_id == user_id, owns_post),
+                )
+                .returning(Comment.id)
+            ).first()
+            if not deleted:
+                self._raise_write_error(db, post_id, comment_id)
+            db.execute(
+                update(Post)
+                .where(Post.id == post_id)
+                .values(comments_count=Post.comments_count - 1)
+            )
             db.commit()
+        except HTTPException:
+            db.rollback()
+            raise
         except Exception as e:
             db.rollback()
             raise HTTPException(status_code=500, detail=str(e))
+        events.publish("comments_changed", post_id=post_id)
+
+    def _raise_write_error(self, db: Session, post_id: int, comment_id: int):
+        """Explain why a guarded comment write matched no row (one query)."""
+        row = db.execute(
+            select(Post.id, Comment.id)
+            .outerjoin(
+                Comment, and_(Comment.id == comment_id, Comment.post_id == Post.id)
+            )
+            .where(Post.id == post_id)
+        ).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Post not found")
+        if row[1] is None:
+            raise HTTPException(status_code=404, detail="Comment not found")
+        raise HTTPException(status_code=403, detail="Forbidden")
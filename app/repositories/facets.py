@@ -0,0 +1,152 @@
+"""Pre-aggregated search facets.
+
+`post_facets` holds the number of posts per (type, rooms_count, price
+bucket). PostRepository adjusts the affected rows in the same transaction
+as every post write, so facet queries read a table whose size depends only
+on the number of distinct types, room counts and buckets, never on the
+number of posts. `rebuild` recomputes it from posts to correct any drift.
+
+Facets are disjunctive: the type counts ignore the type filter, the
+rooms_count counts ignore the rooms filter and the price histogram ignores
+the price filter, so a UI can show the alternatives to each choice. A price
+filter is applied at bucket granularity (buckets overlapping the range).
+"""
+from bisect import bisect_right
+from collections import Counter
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from ..database.models import Post, PostFacet, PostType
+
+# Lower edge of each price bucket; the last bucket is open-ended
+PRICE_BUCKETS = (
+    0, 50_000, 100_000, 200_000, 300_000, 500_000, 1_000_000, 2_000_000,
+    5_000_000, 10_000_000, 20_000_000, 50_000_000, 100_000_000,
+)
+
+FacetKey = Tuple[PostType, int, int]
+
+
+def price_bucket(price: int) -> int:
+    return max(bisect_right(PRICE_BUCKETS, price) - 1, 0)
+
+
+def key(type, rooms_count: int, price: int) -> FacetKey:
+    return (PostType(getattr(type, "value", type)), rooms_count, price_bucket(price))
+
+
+def _upsert_insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+
+def apply(db: Session, deltas: Counter):
+    """Add the per-key deltas (e.g. +1 for a created post) to post_facets."""
+    dialect_insert = _upsert_insert(db)
+    for (type, rooms_count, bucket), delta in deltas.items():
+        if not delta:
+            continue
+        values = {"type": type, "rooms_count": rooms_count, "price_bucket": bucket, "count": delta}
+        if dialect_insert is not None:
+            # One statement per key, safe against a concurrent first insert
+            statement = dialect_insert(PostFacet).values(**values)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=["type", "rooms_count", "price_bucket"],
+                set_={"count": PostFacet.count + statement.excluded.count},
+            ))
+            continue
+        updated = db.execute(
+            update(PostFacet)
+            .where(
+                PostFacet.type == type,
+                PostFacet.rooms_count == rooms_count,
+                PostFacet.price_bucket == bucket,
+            )
+            .values(count=PostFacet.count + delta)
+        ).rowcount
+        if not updated:
+            db.execute(insert(PostFacet).values(**values))
+
+
+def add(db: Session, keys: Iterable[FacetKey]):
+    apply(db, Counter(keys))
+
+
+def remove(db: Session, keys: Iterable[FacetKey]):
+    apply(db, Counter({key: -count for key, count in Counter(keys).items()}))
+
+
+def move(db: Session, old: FacetKey, new: FacetKey):
+    if old != new:
+        apply(db, Counter({old: -1, new: 1}))
+
+
+def _bucket_expression():
+    # Highest edge first, so the first match is the post's bucket
+    whens = [(Post.price >= edge, index) for index, edge in enumerate(PRICE_BUCKETS)]
+    return case(*reversed(whens), else_=0)
+
+
+def rebuild(db: Session) -> int:
+    """Recompute post_facets from posts. Returns the number of facet rows."""
+    bucket = _bucket_expression()
+    db.execute(delete(PostFacet))
+    result = db.execute(
+        insert(PostFacet).from_select(
+            ["type", "rooms_count", "price_bucket", "count"],
+            select(Post.type, Post.rooms_count, bucket, func.count())
+            .group_by(Post.type, Post.rooms_count, bucket),
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+def compute(
+    db: Session,
+    type: Optional[str],
+    rooms_count: Optional[int],
+    price_from: int,
+    price_until: Optional[int],
+) -> dict:
+    """Type counts, rooms_count counts and a price histogram for the filters."""
+    rows = db.execute(
+        select(PostFacet.type, PostFacet.rooms_count, PostFacet.price_bucket, PostFacet.count)
+        .where(PostFacet.count > 0)
+    ).all()
+    type = getattr(type, "value", type)
+    first_bucket = price_bucket(price_from)
+    last_bucket = price_bucket(price_until) if price_until is not None else len(PRICE_BUCKETS) - 1
+
+    types, rooms, prices = Counter(), Counter(), Counter()
+    for row_type, row_rooms, bucket, count in rows:
+        type_ok = type is None or row_type.value == type
+        rooms_ok = rooms_count is None or row_rooms == rooms_count
+        price_ok = first_bucket <= bucket <= last_bucket
+        if rooms_ok and price_ok:
+            types[row_type.value] += count
+        if type_ok and price_ok:
+            rooms[row_rooms] += count
+        if type_ok and rooms_ok:
+            prices[bucket] += count
+
+    return {
+        "type": [{"value": value, "count": count} for value, count in sorted(types.items())],
+        "rooms_count": [
+            {"value": value, "count": count} for value, count in sorted(rooms.items())
+        ],
+        "price": [
+            {
+                "price_from": edge,
+                "price_until": PRICE_BUCKETS[i + 1] if i + 1 < len(PRICE_BUCKETS) else None,
+                "count": prices.get(i, 0),
+            }
+            for i, edge in enumerate(PRICE_BUCKETS)
+        ],
+    }
@@ -0,0 +1,88 @@
+"""Full-text search over post address and description.
+
+SQLite keeps a separate FTS5 table, `posts_fts`, whose rowid is the post id.
+PostRepository writes to it in the same transaction as the post. Postgres
+uses an expression GIN index over to_tsvector(...), so it needs no sync.
+Both are created with the posts table (see app.database.models).
+"""
+import re
+from sqlalchemy import column, func, literal_column, table, text
+from sqlalchemy.orm import Query, Session
+from ..database.models import Post
+
+posts_fts = table("posts_fts", column("rowid"), column("rank"))
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _is_sqlite(db: Session) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def _words(q: str) -> list[str]:
+    return _WORD.findall(q.lower())
+
+
+def index_post(db: Session, post: Post):
+    """Insert or replace the post's row in the FTS table (flushed post required)."""
+    if not _is_sqlite(db):
+        return
+    db.execute(text("DELETE FROM posts_fts WHERE rowid = :id"), {"id": post.id})
+    db.execute(
+        text("INSERT INTO posts_fts (rowid, address, description) VALUES (:id, :address, :description)"),
+        {"id": post.id, "address": post.address, "description": post.description},
+    )
+
+
+def index_posts(db: Session, rows: list[dict]):
+    """Bulk variant of index_post for freshly inserted rows (id, address, description)."""
+    if not _is_sqlite(db) or not rows:
+        return
+    db.execute(
+        text("INSERT INTO posts_fts (rowid, address, description) VALUES (:id, :address, :description)"),
+        rows,
+    )
+
+
+def remove_post(db: Session, post_id: int):
+    if not _is_sqlite(db):
+        return
+    db.execute(text("DELETE FROM posts_fts WHERE rowid = :id"), {"id": post_id})
+
+
+def rebuild(db: Session) -> int:
+    """Repopulate the FTS table from posts. Returns the number of indexed posts."""
+    if not _is_sqlite(db):
+        return 0
+    db.execute(text("DELETE FROM posts_fts"))
+    result = db.execute(
+        text("INSERT INTO posts_fts (rowid, address, description) SELECT id, address, description FROM posts")
+    )
+    db.commit()
+    return result.rowcount
+
+
+def search(db: Session, db_posts: Query, q: str):
+    """Restrict `db_posts` to posts matching every word of `q`.
+
+    The last word also matches as a prefix, so "Esil, near met" finds
+    "near metro". Returns the filtered query and the relevance ordering,
+    or None as the ordering when `q` contains no words.
+    """
+    words = _words(q)
+    if not words:
+        return db_posts, None
+
+    if _is_sqlite(db):
+        # Quote every word so user input cannot inject FTS5 query syntax
+        match = " ".join(f'"{word}"' for word in words) + "*"
+        db_posts = db_posts.join(posts_fts, posts_fts.c.rowid == Post.id).filter(
+            literal_column("posts_fts").op("MATCH")(match)
+        )
+        # bm25(): lower is more relevant
+        return db_posts, posts_fts.c.rank
+
+    document = func.to_tsvector("simple", Post.address + " " + Post.description)
+    query = func.to_tsquery("simple", " & ".join(words[:-1] + [f"{words[-1]}:*"]))
+    db_posts = db_posts.filter(document.op("@@")(query))
+    return db_posts, func.ts_rank(document, query).desc()
@@ -0,0 +1,117 @@
+"""Spatial filtering of posts by radius and bounding box.
+
+SQLite keeps an R*Tree table, `posts_rtree`, with one zero-size box per
+geocoded post. PostRepository writes to it in the same transaction as the
+post. Searches first prune candidates through the R*Tree and then apply the
+exact distance check with the `distance_km` SQL function, which is
+registered on every SQLite connection. Other databases filter on a
+(latitude, longitude) B-tree index and compute the distance in SQL.
+The R*Tree is created with the posts table (see app.database.models).
+"""
+from typing import Optional, Tuple
+from sqlalchemy import column, func, table, text
+from sqlalchemy.orm import Query, Session
+from ..database.models import Post
+from ..utils.geocoding import EARTH_RADIUS_KM, radius_bbox
+
+posts_rtree = table(
+    "posts_rtree",
+    column("id"),
+    column("min_lat"),
+    column("max_lat"),
+    column("min_lon"),
+    column("max_lon"),
+)
+
+BBox = Tuple[float, float, float, float]
+
+
+def _is_sqlite(db: Session) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def index_post(db: Session, post: Post):
+    """Insert, move or drop the post's R*Tree entry (flushed post required)."""
+    if not _is_sqlite(db):
+        return
+    db.execute(text("DELETE FROM posts_rtree WHERE id = :id"), {"id": post.id})
+    if post.latitude is not None and post.longitude is not None:
+        db.execute(
+            text("INSERT INTO posts_rtree VALUES (:id, :lat, :lat, :lon, :lon)"),
+            {"id": post.id, "lat": post.latitude, "lon": post.longitude},
+        )
+
+
+def index_posts(db: Session, rows: list[dict]):
+    """Bulk variant of index_post for freshly inserted rows (id, latitude, longitude)."""
+    rows = [
+        {"id": row["id"], "lat": row["latitude"], "lon": row["longitude"]}
+        for row in rows
+        if row.get("latitude") is not None and row.get("longitude") is not None
+    ]
+    if not _is_sqlite(db) or not rows:
+        return
+    db.execute(text("INSERT INTO posts_rtree VALUES (:id, :lat, :lat, :lon, :lon)"), rows)
+
+
+def remove_post(db: Session, post_id: int):
+    if not _is_sqlite(db):
+        return
+    db.execute(text("DELETE FROM posts_rtree WHERE id = :id"), {"id": post_id})
+
+
+def rebuild(db: Session) -> int:
+    """Repopulate the R*Tree from posts. Returns the number of indexed posts."""
+    if not _is_sqlite(db):
+        return 0
+    db.execute(text("DELETE FROM posts_rtree"))
+    result = db.execute(
+        text(
+            "INSERT INTO posts_rtree SELECT id, latitude, latitude, longitude, longitude "
+            "FROM posts WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+def within_bbox(db: Session, db_posts: Query, bbox: BBox) -> Query:
+    min_lat, min_lon, max_lat, max_lon = bbox
+    if _is_sqlite(db):
+        return db_posts.join(posts_rtree, posts_rtree.c.id == Post.id).filter(
+            posts_rtree.c.max_lat >= min_lat,
+            posts_rtree.c.min_lat <= max_lat,
+            posts_rtree.c.max_lon >= min_lon,
+            posts_rtree.c.min_lon <= max_lon,
+        )
+    return db_posts.filter(
+        Post.latitude.between(min_lat, max_lat),
+        Post.longitude.between(min_lon, max_lon),
+    )
+
+
+def distance_km(db: Session, lat: float, lon: float):
+    """SQL expression for the distance from (lat, lon) to each post."""
+    if _is_sqlite(db):
+        return func.distance_km(Post.latitude, Post.longitude, lat, lon)
+    a = (
+        func.power(func.sin(func.radians(Post.latitude - lat) / 2), 2)
+        + func.cos(func.radians(lat))
+        * func.cos(func.radians(Post.latitude))
+        * func.power(func.sin(func.radians(Post.longitude - lon) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * func.asin(func.least(1.0, func.sqrt(a)))
+
+
+def near(
+    db: Session, db_posts: Query, lat: float, lon: float, radius_km: float,
+    bbox: Optional[BBox] = None,
+) -> Query:
+    """Posts within `radius_km` of (lat, lon), optionally also inside `bbox`."""
+    min_lat, min_lon, max_lat, max_lon = radius_bbox(lat, lon, radius_km)
+    if bbox is not None:
+        # Intersect so the R*Tree is only joined once
+        min_lat, min_lon = max(min_lat, bbox[0]), max(min_lon, bbox[1])
+        max_lat, max_lon = min(max_lat, bbox[2]), min(max_lon, bbox[3])
+    db_posts = within_bbox(db, db_posts, (min_lat, min_lon, max_lat, max_lon))
+    return db_posts.filter(distance_km(db, lat, lon) <= radius_km)
@@ -0,0 +1,338 @@
+"""In-process columnar index of the search filter columns.
+
+Holds the id, type, rooms_count and price of every post in four parallel
+columns sorted by price, so a filter query narrows the price range with two
+binary searches and checks type and rooms over that slice only. Columns are
+NumPy arrays when numpy is installed and `array` module arrays otherwise
+(about 21 bytes per listing either way); numpy is imported when an index
+is created, and PostRepository only imports this module with
+SEARCH_ENGINE=memory. The index only answers which ids
+match; PostRepository reads the page rows by primary key.
+
+With SEARCH_ENGINE=memory the index is warmed at startup and PostRepository
+applies every committed write to it. Writes from other processes are not
+seen, so the index is treated as stale once it is older than
+LISTING_INDEX_MAX_AGE_SECONDS or when a page read from the database no
+longer matches it. A stale index is rebuilt in a background thread and
+searches use SQL until it is ready again.
+
+Writes do not copy the columns. A write masks the ids it replaces or
+removes and adds its listings to a short buffer sorted by price; searches
+merge both, at O(overlay) extra per search. When the overlay holds more
+than OVERLAY_SIZE entries it is folded into new columns, an O(N) copy, so
+a write costs O(OVERLAY_SIZE) and one write in about OVERLAY_SIZE pays for
+the fold. A rebuild starts with an empty overlay.
+"""
+import heapq
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import String, select, type_coerce
+from sqlalchemy.orm import Session
+from ..config import get_settings
+from ..database.database import SessionLocal
+from ..database.models import Post, PostType
+
+logger = logging.getLogger("app.search")
+
+TYPE_CODES = {post_type.value: code for code, post_type in enumerate(PostType)}
+
+# Column layouts: (array typecode, numpy dtype) for price, id, type, rooms_count
+COLUMN_TYPES = (("q", "int64"), ("q", "int64"), ("b", "int8"), ("i", "int32"))
+
+# (id, type, rooms_count, price) as written by PostRepository
+Listing = Tuple[int, object, int, int]
+
+# Masked ids plus buffered listings kept before a write folds them into the columns
+OVERLAY_SIZE = 256
+
+
+def _type_code(type) -> int:
+    return TYPE_CODES[getattr(type, "value", type)]
+
+
+class ListingIndex:
+    def __init__(self, max_age: float, use_numpy: Optional[bool] = None):
+        """`use_numpy` None uses numpy when it is installed."""
+        self.max_age = max_age
+        self._numpy = None
+        if use_numpy is not False:
+            try:
+                import numpy
+            except ImportError:  # optional, the array module columns are used instead
+                if use_numpy:
+                    raise
+            else:
+                self._numpy = numpy
+        self.use_numpy = self._numpy is not None
+        # ((prices, ids, types, rooms) sorted by price, masked ids, buffered
+        # (price, id, type, rooms) listings sorted by price); replaced, never
+        # mutated, so searches read a consistent snapshot without taking the lock
+        self._snapshot = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._pending = None  # writes made while a rebuild is loading
+        self._rebuilding = False
+
+    # Build
+
+    def _empty(self):
+        if self.use_numpy:
+            numpy = self._numpy
+            return tuple(numpy.empty(0, dtype=dtype) for _, dtype in COLUMN_TYPES)
+        return tuple(array(typecode) for typecode, _ in COLUMN_TYPES)
+
+    def load(self, db: Session):
+        """Replace the index with the posts currently in the database."""
+        with self._lock:
+            self._pending = []
+        try:
+            rows = db.execute(
+                select(
+                    Post.price, Post.id, type_coerce(Post.type, String), Post.rooms_count
+                ).order_by(Post.price)
+            ).all()
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+        columns = self._empty()
+        if rows:
+            prices, ids, types, rooms = zip(*rows)
+            values = (prices, ids, [_type_code(type) for type in types], rooms)
+            if self.use_numpy:
+                numpy = self._numpy
+                columns = tuple(
+                    numpy.array(column, dtype=dtype)
+                    for column, (_, dtype) in zip(values, COLUMN_TYPES)
+                )
+            else:
+                columns = tuple(
+                    array(typecode, column)
+                    for column, (typecode, _) in zip(values, COLUMN_TYPES)
+                )
+        with self._lock:
+            # Replay the writes that committed while the rows were loading
+            snapshot = (columns, frozenset(), ())
+            for remove_ids, listings in self._pending:
+                snapshot = self._overlay(snapshot, remove_ids, listings)
+            self._pending = None
+            self._snapshot = snapshot
+            self._built_at = time.monotonic()
+
+    def rebuild(self):
+        """Reload the index in its own session; failures leave searches on SQL."""
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            self.load(db)
+            logger.info(
+                "Listing index loaded %d posts in %.1f ms (%d bytes)",
+                len(self), (time.perf_counter() - started) * 1000, self.nbytes,
+            )
+        except Exception:
+            logger.exception("Loading the listing index failed, searching with SQL")
+        finally:
+            db.close()
+            self._rebuilding = False
+
+    def _schedule_rebuild(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self.rebuild, name="listing-index", daemon=True).start()
+
+    def invalidate(self):
+        """Stop answering from the index until a background rebuild finishes."""
+        self._built_at = float("-inf")
+        self._schedule_rebuild()
+
+    @property
+    def ready(self) -> bool:
+        return (
+            self._snapshot is not None
+            and time.monotonic() - self._built_at < self.max_age
+        )
+
+    def __len__(self) -> int:
+        if self._snapshot is None:
+            return 0
+        (_, ids, _, _), removed, added = self._snapshot
+        if not removed:
+            return len(ids) + len(added)
+        if self.use_numpy:
+            masked = int(self._numpy.isin(ids, list(removed)).sum())
+        else:
+            masked = sum(1 for post_id in ids if post_id in removed)
+        return len(ids) - masked + len(added)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the columns (the overlay is not counted)."""
+        if self._snapshot is None:
+            return 0
+        columns = self._snapshot[0]
+        if self.use_numpy:
+            return sum(column.nbytes for column in columns)
+        return sum(len(column) * column.itemsize for column in columns)
+
+    # Write deltas
+
+    def upsert(self, listings: Iterable[Listing]):
+        """Add committed posts, replacing the previous entries of the same ids."""
+        listings = [
+            (price, post_id, _type_code(type), rooms_count)
+            for post_id, type, rooms_count, price in listings
+        ]
+        self._write({listing[1] for listing in listings}, listings)
+
+    def remove(self, post_ids: Iterable[int]):
+        self._write(set(post_ids), [])
+
+    def _write(self, remove_ids: set, listings: list):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((remove_ids, listings))
+            if self._snapshot is not None:
+                self._snapshot = self._overlay(self._snapshot, remove_ids, listings)
+
+    def _overlay(self, snapshot, remove_ids: set, listings: list):
+        """Return `snapshot` with one write added to its overlay.
+
+        Costs O(overlay); a full overlay is folded into new columns, O(N).
+        """
+        columns, removed, added = snapshot
+        removed = removed | remove_ids
+        added = sorted(
+            [listing for listing in added if listing[1] not in remove_ids] + listings
+        )
+        if len(removed) + len(added) > OVERLAY_SIZE:
+            return self._apply(columns, removed, added), frozenset(), ()
+        return columns, removed, tuple(added)
+
+    def _apply(self, columns, remove_ids: set, listings: list):
+        """Return new columns without `remove_ids` and with `listings` inserted."""
+        if self.use_numpy:
+            numpy = self._numpy
+            if remove_ids:
+                keep = ~numpy.isin(columns[1], list(remove_ids))
+                columns = tuple(column[keep] for column in columns)
+            if listings:
+                listings.sort()
+                positions = numpy.searchsorted(columns[0], [listing[0] for listing in listings])
+                columns = tuple(
+                    numpy.insert(column, positions, [listing[i] for listing in listings])
+                    for i, column in enumerate(columns)
+                )
+            return columns
+
+        columns = tuple(array(column.typecode, column) for column in columns)
+        if remove_ids:
+            # One pass to find the rows, then delete from the end
+            positions = [
+                position for position, post_id in enumerate(columns[1])
+                if post_id in remove_ids
+            ]
+            for position in reversed(positions):
+                for column in columns:
+                    del column[position]
+        for listing in listings:
+            position = bisect_right(columns[0], listing[0])
+            for column, value in zip(columns, listing):
+                column.insert(position, value)
+        return columns
+
+    # Search
+
+    def search(
+        self,
+        type: Optional[str],
+        rooms_count: Optional[int],
+        price_from: int,
+        price_until: Optional[int],
+        after_id: Optional[int],
+        offset: int,
+        limit: int,
+    ) -> Optional[Tuple[List[int], int]]:
+        """Ids of one page in id order and the total number of matches.
+
+        The page starts after `after_id` when it is given and at `offset`
+        otherwise. Returns None when the index cannot answer (not loaded or
+        stale), in which case the caller queries the database.
+        """
+        snapshot = self._snapshot
+        if not self.ready:
+            self._schedule_rebuild()
+            return None
+        (prices, ids, types, rooms), removed, added = snapshot
+        code = _type_code(type) if type else None
+        start = 0 if after_id is not None else offset
+
+        # Buffered listings in the price range that pass the filters
+        low = bisect_left(added, (price_from,)) if price_from > 0 else 0
+        high = bisect_left(added, (price_until + 1,)) if price_until is not None else len(added)
+        extra = [
+            post_id
+            for _, post_id, post_type, post_rooms in added[low:high]
+            if (code is None or post_type == code)
+            and (rooms_count is None or post_rooms == rooms_count)
+        ]
+
+        if self.use_numpy:
+            numpy = self._numpy
+            low = numpy.searchsorted(prices, price_from, side="left") if price_from > 0 else 0
+            high = (
+                numpy.searchsorted(prices, price_until, side="right")
+                if price_until is not None else len(prices)
+            )
+            matched = ids[low:high]
+            mask = None
+            if code is not None:
+                mask = types[low:high] == code
+            if rooms_count is not None:
+                rooms_mask = rooms[low:high] == rooms_count
+                mask = rooms_mask if mask is None else mask & rooms_mask
+            if mask is not None:
+                matched = matched[mask]
+            if removed:
+                # A lookup table over the masked id range; the default compares
+                # `matched` against each masked id in turn
+                matched = matched[~numpy.isin(matched, list(removed), kind="table")]
+            if extra:
+                matched = numpy.concatenate((matched, numpy.array(extra, dtype=matched.dtype)))
+            total = len(matched)
+            if after_id is not None:
+                matched = matched[matched > after_id]
+            # Only the first start + limit ids need to be ordered
+            end = start + limit
+            if end < len(matched):
+                matched = numpy.partition(matched, end - 1)[:end]
+            return numpy.sort(matched)[start:].tolist(), total
+
+        low = bisect_left(prices, price_from) if price_from > 0 else 0
+        high = bisect_right(prices, price_until) if price_until is not None else len(prices)
+        if code is None and rooms_count is None:
+            matched = ids[low:high]
+        else:
+            matched = [
+                post_id
+                for post_id, post_type, post_rooms in zip(
+                    ids[low:high], types[low:high], rooms[low:high]
+                )
+                if (code is None or post_type == code)
+                and (rooms_count is None or post_rooms == rooms_count)
+            ]
+        if removed:
+            matched = [post_id for post_id in matched if post_id not in removed]
+        matched.extend(extra)
+        total = len(matched)
+        if after_id is not None:
+            matched = [post_id for post_id in matched if post_id > after_id]
+        return heapq.nsmallest(start + limit, matched)[start:], total
+
+
+listing_index = ListingIndex(get_settings().listing_index_max_age_seconds)
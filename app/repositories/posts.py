@@ -1,9 +1,63 @@
+from datetime import datetime
 from fastapi import HTTPException
+from sqlalchemy import (
+    String, func, insert, literal_column, select, tuple_, type_coerce, update,
+)
+from sqlalchemy.engine import Row
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import Optional
-from ..database.models import Post, Comment
+from typing import Iterator, List, Optional, Tuple
+from ..database.models import Post, PostType, Comment
 from ..schemas.posts import PostCreate, PostUpdate
+from ..utils.pagination import encode_cursor, decode_cursor
+from ..utils.cache import TTLCache
+from ..config import get_settings
+from ..utils.geocoding import geocode
+from ..utils import events
+from . import facets, fulltext, geo
+
+# Column-only projections for the read endpoints. `type` is read as its stored
+# string so rows validate straight into the response schemas.
+POST_TYPE = type_coerce(Post.type, String).label("type")
+SEARCH_COLUMNS = (
+    Post.id, POST_TYPE, Post.price, Post.address, Post.area, Post.rooms_count,
+    Post.latitude, Post.longitude,
+)
+POST_INFO_COLUMNS = SEARCH_COLUMNS + (
+    Post.description, Post.user_id, Post.comments_count.label("total_comments"),
+)
+
+# Unary plus keeps SQLite from answering a price range through a price
+# index, which returns rows in price order and would need a sort to page by id
+UNINDEXED_PRICE = literal_column("+posts.price")
+
+# sort parameter -> (column, descending). Ties break on id in the same
+# direction, so each order is one forward or backward scan of a
+# (column, id) index.
+SORT_ORDERS = {
+    "price": (Post.price, False),
+    "-price": (Post.price, True),
+    "area": (Post.area, False),
+    "-area": (Post.area, True),
+    "newest": (Post.created_at, True),
+}
+
+# Search totals keyed by the normalized filter tuple, shared by all instances
+count_cache = TTLCache(
+    get_settings().count_cache_max_entries, get_settings().count_cache_ttl_seconds
+)
+
+
+def _listing_index():
+    """The in-memory listing index with SEARCH_ENGINE=memory, otherwise None.
+
+    Imported on first use, so the SQL engine never loads it (or numpy).
+    """
+    if get_settings().search_engine != "memory":
+        return None
+    from .listing_index import listing_index
+
+    return listing_index
 
 
 class PostRepository:
@@ -29,9 +83,19 @@ class PostRepository:
                 )
 
             db_post = Post(**post_data.model_dump(), user_id=user_id)
+            if db_post.latitude is None or db_post.longitude is None:
+                db_post.latitude, db_post.longitude = geocode(db_post.address) or (None, None)
             db.add(db_post)
+            db.flush()
+            fulltext.index_post(db, db_post)
+            geo.index_post(db, db_post)
+            facets.add(db, [facets.key(db_post.type, db_post.rooms_count, db_post.price)])
             db.commit()
             db.refresh(db_post)
+            count_cache.clear()
+            index = _listing_index()
+            if index is not None:
+                index.upsert([(db_post.id, db_post.type, db_post.rooms_count, db_post.price)])
 
         except IntegrityError:
             db.rollback()
@@ -39,18 +103,47 @@ class PostRepository:
 
         return db_post.id
 
-    def get_post_by_id(self, db: Session, post_id: int):
-        db_post = db.query(Post).filter(Post.id == post_id).first()
+    def get_post_by_id(self, db: Session, post_id: int) -> Row:
+        return self._found(db.execute(self._post_statement(post_id)).first())
+
+    def get_posts_by_ids(self, db: Session, post_ids: List[int]) -> dict:
+        """Fetch several posts in one IN query; returns {id: row} for those found.
+
+        comments_count is kept on the post, so no comment aggregate is needed.
+        """
+        if not post_ids:
+            return {}
+        return {row.id: row for row in db.execute(self._posts_statement(post_ids))}
+
+    def _post_statement(self, post_id: int):
+        return select(*POST_INFO_COLUMNS).where(Post.id == post_id)
+
+    def _posts_statement(self, post_ids: List[int]):
+        return select(*POST_INFO_COLUMNS).where(Post.id.in_(set(post_ids)))
+
+    def _found(self, db_post: Optional[Row]) -> Row:
         if not db_post:
             raise HTTPException(status_code=404, detail="Post not found")
-        db_comments = db.query(Comment).filter(
-            Comment.post_id == post_id
-        ).all()
+        return db_post
 
-        if not db_comments:
-            return db_post, 0
-        total_comments = len(db_comments)
-        return db_post, total_comments
+    def recount_comments(self, db: Session) -> int:
+        """Repair comments_count on posts whose counter drifted.
+
+        Returns the number of posts that were fixed.
+        """
+        actual_count = (
+            select(func.count(Comment.id))
+            .where(Comment.post_id == Post.id)
+            .scalar_subquery()
+        )
+        result = db.execute(
+            update(Post)
+            .where(Post.comments_count != actual_count)
+            .values(comments_count=actual_count)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount
 
     def update_post(
         self, db: Session, post_id: int, user_id: int, post_data: PostUpdate
@@ -62,15 +155,27 @@ class PostRepository:
         if db_post.user_id != user_id:
             raise HTTPException(status_code=403, detail="Forbidden")
 
-        for field, value in post_data.model_dump(exclude_unset=True).items():
+        old_facet = facets.key(db_post.type, db_post.rooms_count, db_post.price)
+        changes = post_data.model_dump(exclude_unset=True)
+        for field, value in changes.items():
             setattr(db_post, field, value)
+        if "address" in changes and not {"latitude", "longitude"} & changes.keys():
+            db_post.latitude, db_post.longitude = geocode(db_post.address) or (None, None)
 
         try:
+            fulltext.index_post(db, db_post)
+            geo.index_post(db, db_post)
+            facets.move(db, old_facet, facets.key(db_post.type, db_post.rooms_count, db_post.price))
             db.commit()
             db.refresh(db_post)
         except IntegrityError:
             db.rollback()
             raise HTTPException(status_code=400, detail="Integrity Error")
+        count_cache.clear()
+        index = _listing_index()
+        if index is not None:
+            index.upsert([(db_post.id, db_post.type, db_post.rooms_count, db_post.price)])
+        events.publish("post_changed", post_id=post_id)
 
     def delete_post(self, db: Session, post_id: int, user_id: int):
         db_post = db.query(Post).filter(Post.id == post_id).first()
@@ -80,7 +185,15 @@ class PostRepository:
             raise HTTPException(status_code=403, detail="Forbidden")
 
         db.delete(db_post)
+        fulltext.remove_post(db, post_id)
+        geo.remove_post(db, post_id)
+        facets.remove(db, [facets.key(db_post.type, db_post.rooms_count, db_post.price)])
         db.commit()
+        count_cache.clear()
+        index = _listing_index()
+        if index is not None:
+            index.remove([post_id])
+        events.publish("post_changed", post_id=post_id)
         return db_post
 
     def get_posts(
@@ -92,16 +205,370 @@ class PostRepository:
         rooms_count: Optional[int],
         price_from: int,
         price_until: Optional[int],
+        cursor: Optional[str] = None,
+        total: str = "estimate",
+        q: Optional[str] = None,
+        near: Optional[Tuple[float, float]] = None,
+        radius_km: Optional[float] = None,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        sort: Optional[str] = None,
+    ):
+        if (
+            get_settings().search_engine == "memory"
+            and q is None and near is None and bbox is None and sort is None
+        ):
+            page = self._get_indexed_posts(
+                db, limit, offset, type, rooms_count, price_from, price_until, cursor, total
+            )
+            if page is not None:
+                return page
+
+        # Taken before counting, so a write committed meanwhile drops the count
+        generation = count_cache.generation()
+        page, count, filters_key, sort_column = self._search_statements(
+            db, limit, offset, type, rooms_count, price_from, price_until, cursor,
+            q, near, radius_km, bbox, sort,
+        )
+        total_count = self._cached_count(filters_key, total)
+        if total_count is None and total != "none":
+            total_count = db.scalar(count)
+            self._store_count(filters_key, total_count, generation)
+        db_posts, next_cursor = self._page(db.execute(page).all(), limit, sort_column)
+        return db_posts, total_count, next_cursor
+
+    def _search_statements(
+        self,
+        db: Session,
+        limit: int,
+        offset: int,
+        type: Optional[str],
+        rooms_count: Optional[int],
+        price_from: int,
+        price_until: Optional[int],
+        cursor: Optional[str],
+        q: Optional[str],
+        near: Optional[Tuple[float, float]],
+        radius_km: Optional[float],
+        bbox: Optional[Tuple[float, float, float, float]],
+        sort: Optional[str],
     ):
+        """Build the SQL search: (page, count, count cache key, sort column).
+
+        Nothing is executed, so the async repositories await the same
+        statements (`db` is only used to build them).
+        """
+        db_posts, relevance = self._filter_posts(
+            db, type, rooms_count, price_from, price_until, q, near, radius_km, bbox
+        )
+        filters_key = (
+            getattr(type, "value", type), rooms_count, price_from, price_until, q,
+            near, radius_km if near is not None else None, bbox,
+        )
+        count = select(func.count()).select_from(db_posts.subquery())
+        if sort is None and relevance is None and (price_from > 0 or price_until is not None):
+            # An id-ordered page walks ids (through the type/rooms_count index
+            # when those are set) and checks the price range until LIMIT rows
+            # match; the count above still seeks the price index
+            db_posts, _ = self._filter_posts(
+                db, type, rooms_count, price_from, price_until, q, near, radius_km, bbox,
+                price_index=False,
+            )
+        db_posts = db_posts.with_entities(*SEARCH_COLUMNS)
+
+        if relevance is not None and sort is None:
+            # Relevance order has no stable seek key, so keyword search pages by offset
+            # (LIMIT rows, so _page never returns a cursor)
+            if cursor is not None:
+                raise HTTPException(
+                    status_code=400, detail="Cursor pagination is not supported with q"
+                )
+            db_posts = db_posts.order_by(relevance, Post.id).offset(offset).limit(limit)
+            return db_posts.statement, count, filters_key, None
+
+        # Keyset mode: seek past the last seen (sort value, id) instead of skipping rows
+        sort_column = None
+        if sort is not None:
+            sort_column, descending = SORT_ORDERS[sort]
+            db_posts = db_posts.add_columns(sort_column.label("sort_value"))
+            if descending:
+                db_posts = db_posts.order_by(sort_column.desc(), Post.id.desc())
+            else:
+                db_posts = db_posts.order_by(sort_column, Post.id)
+            if cursor is not None:
+                seek = tuple_(sort_column, Post.id)
+                last = tuple_(*self._decode_sort_cursor(cursor, sort_column))
+                db_posts = db_posts.filter(seek < last if descending else seek > last)
+        else:
+            db_posts = db_posts.order_by(Post.id)
+            if cursor is not None:
+                db_posts = db_posts.filter(Post.id > self._decode_id_cursor(cursor))
+        if cursor is None:
+            db_posts = db_posts.offset(offset)
+
+        # Fetch one extra row to know whether there is a next page
+        return db_posts.limit(limit + 1).statement, count, filters_key, sort_column
+
+    def _page(self, db_posts: list, limit: int, sort_column) -> Tuple[list, Optional[str]]:
+        """Trim the extra row of a keyset page and encode the next cursor."""
+        next_cursor = None
+        if len(db_posts) > limit:
+            db_posts = db_posts[:limit]
+            last = db_posts[-1]
+            if sort_column is None:
+                next_cursor = encode_cursor(last.id)
+            elif sort_column is Post.created_at:
+                next_cursor = encode_cursor(last.sort_value.isoformat(), last.id)
+            else:
+                next_cursor = encode_cursor(last.sort_value, last.id)
+        return db_posts, next_cursor
+
+    def _decode_id_cursor(self, cursor: str) -> int:
+        (last_id,) = decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return last_id
+
+    def _decode_sort_cursor(self, cursor: str, sort_column) -> Tuple[object, int]:
+        value, last_id = decode_cursor(cursor, 2)
+        if sort_column is Post.created_at:
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if not isinstance(last_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return value, last_id
+
+    def _get_indexed_posts(
+        self,
+        db: Session,
+        limit: int,
+        offset: int,
+        type: Optional[str],
+        rooms_count: Optional[int],
+        price_from: int,
+        price_until: Optional[int],
+        cursor: Optional[str],
+        total: str,
+    ):
+        """get_posts through the in-memory listing index.
+
+        Returns None when the index cannot answer, so the caller uses SQL.
+        The index gives the page ids and an exact total; the rows are read
+        by primary key and checked against the filters, which catches writes
+        made by other processes.
+        """
+        index = _listing_index()
+        last_id = self._decode_id_cursor(cursor) if cursor is not None else None
+        type = getattr(type, "value", type)
+        result = index.search(
+            type, rooms_count, price_from, price_until, last_id, offset, limit + 1
+        )
+        if result is None:
+            return None
+        page_ids, total_count = result
+
+        db_posts = []
+        if page_ids:
+            db_posts = db.execute(
+                select(*SEARCH_COLUMNS).where(Post.id.in_(page_ids)).order_by(Post.id)
+            ).all()
+        stale = len(db_posts) != len(page_ids) or any(
+            (type and post.type != type)
+            or (rooms_count is not None and post.rooms_count != rooms_count)
+            or (price_from > 0 and post.price < price_from)
+            or (price_until is not None and post.price > price_until)
+            for post in db_posts
+        )
+        if stale:
+            index.invalidate()
+            return None
+
+        next_cursor = None
+        if len(db_posts) > limit:
+            db_posts = db_posts[:limit]
+            next_cursor = encode_cursor(db_posts[-1].id)
+        return db_posts, (None if total == "none" else total_count), next_cursor
+
+    def import_posts(
+        self, db: Session, user_id: int, posts_data: List[PostCreate]
+    ) -> Tuple[int, int]:
+        """Insert a chunk of posts in one transaction, skipping duplicates.
+
+        Duplicates (same seven fields as the create_post check, against
+        existing rows or earlier rows of the chunk) are found with a single
+        set-based query. Returns (inserted, duplicates).
+        """
+        rows = []
+        for post_data in posts_data:
+            row = post_data.model_dump()
+            row["type"] = PostType(post_data.type.value)
+            if row["latitude"] is None or row["longitude"] is None:
+                row["latitude"], row["longitude"] = geocode(row["address"]) or (None, None)
+            row["user_id"] = user_id
+            rows.append(row)
+        if not rows:
+            return 0, 0
+
+        def dedupe_key(row):
+            return (
+                row["type"], row["price"], row["address"], row["area"],
+                row["rooms_count"], row["description"],
+            )
+
+        existing = db.execute(
+            select(
+                Post.type, Post.price, Post.address, Post.area,
+                Post.rooms_count, Post.description,
+            ).where(
+                Post.user_id == user_id,
+                tuple_(Post.address, Post.price).in_(
+                    {(row["address"], row["price"]) for row in rows}
+                ),
+            )
+        )
+        seen = {tuple(existing_row) for existing_row in existing}
+        new_rows = []
+        for row in rows:
+            key = dedupe_key(row)
+            if key not in seen:
+                seen.add(key)
+                new_rows.append(row)
+
+        try:
+            if new_rows:
+                # executemany; RETURNING gives the ids for the search indexes
+                inserted = db.execute(
+                    insert(Post).returning(
+                        Post.id, Post.address, Post.description, Post.latitude, Post.longitude,
+                        Post.type, Post.rooms_count, Post.price,
+                    ),
+                    new_rows,
+                ).mappings().all()
+                fulltext.index_posts(db, [dict(row) for row in inserted])
+                geo.index_posts(db, [dict(row) for row in inserted])
+                facets.add(db, (
+                    facets.key(row["type"], row["rooms_count"], row["price"]) for row in new_rows
+                ))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Integrity error")
+        count_cache.clear()
+        index = _listing_index()
+        if new_rows and index is not None:
+            index.upsert(
+                (row["id"], row["type"], row["rooms_count"], row["price"]) for row in inserted
+            )
+        return len(new_rows), len(rows) - len(new_rows)
+
+    def iter_posts(
+        self,
+        db: Session,
+        type: Optional[str],
+        rooms_count: Optional[int],
+        price_from: int,
+        price_until: Optional[int],
+        q: Optional[str] = None,
+        near: Optional[Tuple[float, float]] = None,
+        radius_km: Optional[float] = None,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+    ) -> Iterator[dict]:
+        """Yield every matching post as a dict, ordered by id.
+
+        Rows are streamed from the cursor in batches of EXPORT_BATCH_SIZE,
+        so memory use does not grow with the result set.
+        """
+        db_posts, _ = self._filter_posts(
+            db, type, rooms_count, price_from, price_until, q, near, radius_km, bbox
+        )
+        db_posts = (
+            db_posts.with_entities(
+                Post.id, Post.type, Post.price, Post.address, Post.area,
+                Post.rooms_count, Post.description, Post.latitude, Post.longitude,
+            )
+            .order_by(Post.id)
+            .execution_options(stream_results=True, yield_per=get_settings().export_batch_size)
+        )
+        for row in db_posts:
+            post = row._asdict()
+            post["type"] = post["type"].value
+            yield post
+
+    def _filter_posts(
+        self,
+        db: Session,
+        type: Optional[str],
+        rooms_count: Optional[int],
+        price_from: int,
+        price_until: Optional[int],
+        q: Optional[str] = None,
+        near: Optional[Tuple[float, float]] = None,
+        radius_km: Optional[float] = None,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        price_index: bool = True,
+    ):
+        """Build the filtered posts query shared by search and export.
+
+        Returns the query and the relevance ordering (None unless `q` is set).
+        With `price_index` False the price range is checked row by row.
+        """
+        price = Post.price if price_index else UNINDEXED_PRICE
         db_posts = db.query(Post)
         if type:
             db_posts = db_posts.filter(Post.type == type)
         if rooms_count is not None:
             db_posts = db_posts.filter(Post.rooms_count == rooms_count)
         if price_until is not None:
-            db_posts = db_posts.filter(Post.price <= price_until)
-        db_posts = db_posts.filter(Post.price >= price_from)
-        total_count = db_posts.count()
-        db_posts = db_posts.limit(limit).offset(offset).all()
-        return db_posts, total_count
+            db_posts = db_posts.filter(price <= price_until)
+        if price_from > 0:
+            # The default lower bound of 0 would only steer the planner to a
+            # price index and away from the index of the requested sort order
+            db_posts = db_posts.filter(price >= price_from)
+        if near is not None:
+            db_posts = geo.near(db, db_posts, near[0], near[1], radius_km, bbox)
+        elif bbox is not None:
+            db_posts = geo.within_bbox(db, db_posts, bbox)
+        relevance = None
+        if q:
+            db_posts, relevance = fulltext.search(db, db_posts, q)
+        return db_posts, relevance
+
+    def get_facets(
+        self,
+        db: Session,
+        type: Optional[str],
+        rooms_count: Optional[int],
+        price_from: int,
+        price_until: Optional[int],
+    ) -> dict:
+        """Facet counts for the filters, read from the pre-aggregated table."""
+        return facets.compute(db, type, rooms_count, price_from, price_until)
+
+    def rebuild_facets(self, db: Session) -> int:
+        """Recompute the facet counts from the posts table."""
+        return facets.rebuild(db)
+
+    def rebuild_search_index(self, db: Session) -> int:
+        """Repopulate the full-text index from the posts table."""
+        return fulltext.rebuild(db)
+
+    def rebuild_geo_index(self, db: Session) -> int:
+        """Repopulate the spatial index from the posts table."""
+        return geo.rebuild(db)
+
+    def _cached_count(self, filters_key: tuple, total: str) -> Optional[int]:
+        """The cached total, or None when the caller has to count.
+
+        "none" skips counting, "estimate" may answer from the count cache
+        and "exact" always runs COUNT (refreshing the cache).
+        """
+        if total == "estimate":
+            return count_cache.get(filters_key)
+        return None
 
+    def _store_count(self, filters_key: tuple, total_count: int, generation: int):
+        """Cache a total unless a write cleared the cache after `generation`."""
+        count_cache.set(filters_key, total_count, generation=generation)
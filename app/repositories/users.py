@@ -1,7 +1,10 @@
+import pytz
+from datetime import datetime
 from fastapi import HTTPException
+from sqlalchemy import insert, literal, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from ..database.models import User, Post
+from ..database.models import User, Post, Favorite
 from ..schemas.users import UserCreate, UserLogin, UserUpdate, FavoriteInfo
 from typing import List
 
@@ -65,51 +68,53 @@ class UsersRepository:
         return db_user
 
     def add_to_favorites(self, db: Session, user_id: int, post_id: int):
-        db_user = db.query(User).filter(User.id == user_id).first()
-        if not db_user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        db_post = db.query(Post).filter(Post.id == post_id).first()
-        if not db_post:
-            raise HTTPException(status_code=404, detail="Post not found")
-
-        if db_user.favorites is None:
-            db_user.favorites = ""
-
-        if str(post_id) in db_user.favorites:
-            raise HTTPException(status_code=400,
-                                detail="Post already in favorites")
         try:
-            db_user.favorites += f"{post_id}, "
+            # INSERT ... SELECT inserts nothing when the user or post is missing
+            added = db.execute(
+                insert(Favorite)
+                .from_select(
+                    ["user_id", "post_id", "created_at"],
+                    select(User.id, Post.id, literal(datetime.now(pytz.timezone("Asia/Almaty"))))
+                    .join(Post, Post.id == post_id)
+                    .where(User.id == user_id),
+                )
+                .returning(Favorite.post_id)
+            ).first()
+            if not added:
+                db.rollback()
+                if db.query(Post.id).filter(Post.id == post_id).first() is None:
+                    raise HTTPException(status_code=404, detail="Post not found")
+                raise HTTPException(status_code=404, detail="User not found")
             db.commit()
-            db.refresh(db_user)
-        except Exception as e:
+        except IntegrityError:
             db.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
-
-    def get_favorites(self, db: Session, user_id: int) -> List[FavoriteInfo]:
-        db_user = db.query(User).filter(User.id == user_id).first()
-        if not db_user:
-            raise HTTPException(status_code=404, detail="User not found")
+            raise HTTPException(status_code=400,
+                                detail="Post already in favorites")
 
-        spliited_favs = db_user.favorites.split(",")
-        favs_list = []
-        for post_id in spliited_favs:
-            db_post = db.query(Post).filter(Post.id == post_id).first()
-            if not db_post:
-                continue
-            favs_list.append(FavoriteInfo(id=post_id, address=db_post.address))
-        return favs_list
+    def get_favorites(
+        self, db: Session, user_id: int, limit: int, offset: int
+    ) -> List[FavoriteInfo]:
+        db_favorites = (
+            db.query(Post.id, Post.address)
+            .join(Favorite, Favorite.post_id == Post.id)
+            .filter(Favorite.user_id == user_id)
+            .order_by(Favorite.created_at, Favorite.post_id)
+            .limit(limit)
+            .offset(offset)
+            .all()
+        )
+        return [
+            FavoriteInfo(id=post_id, address=address)
+            for post_id, address in db_favorites
+        ]
 
     def delete_from_favorites(self, db: Session, user_id: int, post_id: int):
-        db_user = db.query(User).filter(User.id == user_id).first()
-        if not db_user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        if str(post_id) not in db_user.favorites:
+        deleted = (
+            db.query(Favorite)
+            .filter(Favorite.user_id == user_id, Favorite.post_id == post_id)
+            .delete(synchronize_session=False)
+        )
+        if not deleted:
             raise HTTPException(status_code=404,
                                 detail="Post not in favorites")
-
-        db_user.favorites = db_user.favorites.replace(f"{post_id},", "")
         db.commit()
-        db.refresh(db_user)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -8,6 +8,8 @@ class CommentCreate(BaseModel):
 
 
 class CommentInfo(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     content: str
     created_at: datetime
@@ -16,3 +18,4 @@ class CommentInfo(BaseModel):
 
 class CommentInfoList(BaseModel):
     comments: List[CommentInfo]
+    next_cursor: Optional[str] = None
@@ -1,6 +1,5 @@
-from pydantic import BaseModel
-from typing import List
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Union
 import enum
 
 
@@ -16,9 +15,14 @@ class PostCreate(BaseModel):
     area: float
     rooms_count: int
     description: str
+    # Geocoded from the address when omitted
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 
 class PostInfo(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     type: str
     price: int
@@ -28,6 +32,14 @@ class PostInfo(BaseModel):
     description: str
     user_id: int
     total_comments: int
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+class PostBatch(BaseModel):
+    # In the requested order; None where the id does not exist
+    posts: List[Optional[PostInfo]]
+    missing: List[int]
 
 
 class PostUpdate(BaseModel):
@@ -37,17 +49,42 @@ class PostUpdate(BaseModel):
     area: float = None
     rooms_count: int = None
     description: str = None
+    latitude: float = Field(None, ge=-90, le=90)
+    longitude: float = Field(None, ge=-180, le=180)
 
 
 class SearchShanyrak(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     type: str
     price: int
     address: str
     area: float
     rooms_count: int
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+class FacetCount(BaseModel):
+    value: Union[str, int]
+    count: int
+
+
+class PriceBucket(BaseModel):
+    price_from: int
+    price_until: Optional[int] = None
+    count: int
+
+
+class SearchFacets(BaseModel):
+    type: List[FacetCount]
+    rooms_count: List[FacetCount]
+    price: List[PriceBucket]
 
 
 class SearchShanyrakList(BaseModel):
-    total: int
+    total: Optional[int] = None
     objects: List[SearchShanyrak]
+    next_cursor: Optional[str] = None
+    facets: Optional[SearchFacets] = None
@@ -0,0 +1,93 @@
+"""Incremental parsing of NDJSON and CSV request bodies for bulk import.
+
+The body is consumed chunk by chunk from `request.stream()`, so an upload
+is never held in memory as a whole. CSV records may span several lines when
+a quoted field contains a newline; a record is complete once its quotes are
+balanced. A line that is not valid UTF-8 is reported as an error for its
+row rather than failing the whole upload.
+"""
+import csv
+import json
+from typing import AsyncIterator, Tuple, Union
+
+NDJSON = "application/x-ndjson"
+CSV = "text/csv"
+FORMATS = {NDJSON, "application/jsonl", "application/json", CSV}
+
+
+def _decode(line: bytes) -> Union[str, ValueError]:
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError as e:
+        return ValueError(f"Invalid UTF-8 at byte {e.start}")
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[Union[str, ValueError]]:
+    """Yield decoded lines; a line that is not valid UTF-8 yields a ValueError."""
+    buffer = b""
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield _decode(line)
+    if buffer:
+        yield _decode(buffer)
+
+
+async def iter_records(
+    stream: AsyncIterator[bytes], content_type: str
+) -> AsyncIterator[Tuple[int, dict]]:
+    """Yield (row number, record) pairs; malformed rows yield a ValueError instead of a dict.
+
+    An undecodable CSV header ends the upload with a ValueError for row 0.
+    """
+    if content_type != CSV:
+        row = 0
+        async for line in iter_lines(stream):
+            if isinstance(line, ValueError):
+                row += 1
+                yield row, line
+                continue
+            if not line.strip():
+                continue
+            row += 1
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("Expected a JSON object")
+            except ValueError as e:
+                record = ValueError(str(e))
+            yield row, record
+        return
+
+    header = None
+    pending = ""
+    row = 0
+    async for line in iter_lines(stream):
+        if isinstance(line, ValueError):
+            if header is None:
+                yield 0, ValueError(f"Header: {line}")
+                return
+            # The bad line ends the record it belongs to
+            pending = ""
+            row += 1
+            yield row, line
+            continue
+        pending = f"{pending}\n{line}" if pending else line
+        if pending.count('"') % 2:
+            continue
+        text, pending = pending, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        # Empty cells mean "not given", e.g. coordinates to be geocoded
+        yield row, {name: value for name, value in zip(header, values) if value != ""}
+    if pending:
+        yield row + 1, ValueError("Unterminated quoted field")
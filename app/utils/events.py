@@ -0,0 +1,21 @@
+"""In-process write events.
+
+Repositories publish an event after a write commits; caches and derived
+indexes subscribe to stay in step without the repositories knowing them.
+
+    post_changed(post_id)      a post was updated or deleted
+    comments_changed(post_id)  a comment on the post was created, updated or deleted
+"""
+from collections import defaultdict
+from typing import Callable
+
+_handlers: dict[str, list[Callable]] = defaultdict(list)
+
+
+def subscribe(event: str, handler: Callable):
+    _handlers[event].append(handler)
+
+
+def publish(event: str, **payload):
+    for handler in _handlers[event]:
+        handler(**payload)
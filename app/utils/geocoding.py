@@ -0,0 +1,88 @@
+"""Offline geocoding and distance helpers.
+
+Addresses are resolved by a pluggable gazetteer that never goes over the
+network. The default one reads a local CSV of `name,latitude,longitude`
+rows from GAZETTEER_PATH and matches the longest place name contained in the
+address ("Esil district, Kabanbay Batyr 53" -> "Esil district"). Another
+gazetteer can be plugged in with `set_gazetteer`.
+"""
+import csv
+import math
+import re
+from typing import Optional, Protocol, Tuple
+from ..config import get_settings
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+Coordinates = Tuple[float, float]
+
+
+class Gazetteer(Protocol):
+    def lookup(self, address: str) -> Optional[Coordinates]:
+        ...
+
+
+def _normalize(value: str) -> str:
+    return " ".join(re.findall(r"\w+", value.lower()))
+
+
+class LocalGazetteer:
+    def __init__(self, path: str):
+        self.places = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                self.places[_normalize(row["name"])] = (
+                    float(row["latitude"]),
+                    float(row["longitude"]),
+                )
+        # Longest names first so "esil district" wins over "esil"
+        self._names = sorted(self.places, key=len, reverse=True)
+
+    def lookup(self, address: str) -> Optional[Coordinates]:
+        normalized = f" {_normalize(address)} "
+        for name in self._names:
+            if f" {name} " in normalized:
+                return self.places[name]
+        return None
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_loaded = False
+
+
+def set_gazetteer(gazetteer: Optional[Gazetteer]):
+    global _gazetteer, _gazetteer_loaded
+    _gazetteer = gazetteer
+    _gazetteer_loaded = True
+
+
+def geocode(address: str) -> Optional[Coordinates]:
+    """Resolve an address to (latitude, longitude), or None if unknown."""
+    global _gazetteer, _gazetteer_loaded
+    if not _gazetteer_loaded:
+        path = get_settings().gazetteer_path
+        _gazetteer = LocalGazetteer(path) if path else None
+        _gazetteer_loaded = True
+    if _gazetteer is None:
+        return None
+    return _gazetteer.lookup(address)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> Optional[float]:
+    """Great-circle distance in kilometres."""
+    if None in (lat1, lon1, lat2, lon2):
+        return None
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bbox(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """Bounding box (min_lat, min_lon, max_lat, max_lon) enclosing a radius."""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(lat))
+    dlon = 180.0 if cos_lat < 1e-6 else min(radius_km / (KM_PER_DEGREE_LAT * cos_lat), 180.0)
+    return (max(lat - dlat, -90.0), lon - dlon, min(lat + dlat, 90.0), lon + dlon)
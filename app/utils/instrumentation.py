@@ -0,0 +1,122 @@
+"""Per-request SQL accounting and slow-query logging.
+
+`instrument_engine` hooks the engine's cursor events; every statement is
+timed and added to the stats of the request that issued it, which
+SQLInstrumentationMiddleware keeps in a context variable (copied into the
+threadpool and into `run_sync`, so repository code is covered). The totals
+go out in a `Server-Timing: db;dur=...` header. Statements slower than
+SLOW_QUERY_MS are logged with their route and with bound parameter values
+replaced by their type names.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from ..config import get_settings
+
+logger = logging.getLogger("app.sql")
+
+
+class RequestStats:
+    __slots__ = ("scope", "queries", "duration")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.queries = 0
+        self.duration = 0.0
+
+    @property
+    def route(self) -> str:
+        # Route template once routing has run, e.g. "GET /shanyraks/{id}"
+        route = self.scope.get("route")
+        path = getattr(route, "path", None) or self.scope["path"]
+        return f"{self.scope['method']} {path}"
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_sql_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def redact(parameters) -> str:
+    """Show the shape of bound parameters without their values."""
+    if isinstance(parameters, dict):
+        fields = (f"{key}: <{type(value).__name__}>" for key, value in parameters.items())
+        return "{" + ", ".join(fields) + "}"
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            # executemany: the first row is representative
+            return f"{len(parameters)} x {redact(parameters[0])}"
+        return "(" + ", ".join(f"<{type(value).__name__}>" for value in parameters) + ")"
+    return f"<{type(parameters).__name__}>"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.duration += elapsed
+    if elapsed * 1000 >= get_settings().slow_query_ms:
+        logger.warning(
+            "Slow query (%.1f ms) on %s: %s params=%s",
+            elapsed * 1000,
+            stats.route if stats is not None else "-",
+            " ".join(statement.split()),
+            redact(parameters),
+        )
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not fire for failed statements
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def instrument_engine(engine):
+    """Attach the timing hooks to a (sync) Engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class SQLInstrumentationMiddleware:
+    """Pure ASGI middleware that collects SQL stats for each HTTP request."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start" and get_settings().server_timing:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.duration * 1000:.1f};desc="{stats.queries} queries"',
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            logger.debug(
+                "%s: %d queries, %.1f ms", stats.route, stats.queries, stats.duration * 1000
+            )
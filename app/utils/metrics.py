@@ -0,0 +1,273 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are sharded per thread: each thread updates its own
+dict without taking a lock (the event loop thread, threadpool workers and
+the password hashing threads each get one), and `render()` sums the shards
+when /metrics is scraped. When a thread exits, its shard is folded into a
+retired total, so the shards follow the live threads rather than every
+thread the process ever ran. Gauges that describe current state (the DB pool,
+the hashing executor) are read from callbacks at scrape time.
+
+Every server process keeps its own registry, so with several uvicorn
+workers each one is scraped (or aggregated) separately, as with any
+per-process Prometheus client.
+"""
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Live shards by id(), and the sums of the shards of threads that exited
+_shards: Dict[int, dict] = {}
+_retired: dict = {}
+_shards_lock = threading.Lock()
+
+
+def _add(total: dict, key, value):
+    if isinstance(value, list):
+        slots = total.setdefault(key, [0] * len(value))
+        for i, item in enumerate(value):
+            slots[i] += item
+    else:
+        total[key] = total.get(key, 0) + value
+
+
+def _retire(values: dict):
+    with _shards_lock:
+        del _shards[id(values)]
+        for key, value in values.items():
+            _add(_retired, key, value)
+
+
+class _ThreadMarker:
+    """Lives in one thread's local storage and is released when the thread exits."""
+
+
+class _Shard(threading.local):
+    def __init__(self):
+        self.values = values = {}
+        self.marker = _ThreadMarker()
+        # Taken once per thread, never on the update path
+        with _shards_lock:
+            _shards[id(values)] = values
+        weakref.finalize(self.marker, _retire, values).atexit = False
+
+
+_local = _Shard()
+
+
+def _merged(name: str) -> Dict[tuple, object]:
+    # Snapshot both under the lock so a retiring shard is counted exactly once
+    with _shards_lock:
+        shards = list(_shards.values())
+        retired = [(key, value[:] if isinstance(value, list) else value)
+                   for key, value in _retired.items() if key[0] == name]
+    merged = {}
+    for (_, labels), value in retired:
+        _add(merged, labels, value)
+    for shard in shards:
+        for (metric, labels), value in shard.copy().items():
+            if metric == name:
+                _add(merged, labels, value)
+    return merged
+
+
+def _format_labels(names: Sequence[str], values: Iterable) -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+
+    def inc(self, *labels, amount: float = 1):
+        values = _local.values
+        key = (self.name, labels)
+        values[key] = values.get(key, 0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(_merged(self.name).items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """A gauge updated with inc/dec (shards hold deltas) or read from a callback."""
+
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str] = (),
+        callback: Callable[[], Dict[tuple, float]] = None,
+    ):
+        super().__init__(name, help, labelnames)
+        self.callback = callback
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def collect(self) -> List[str]:
+        values = self.callback() if self.callback else _merged(self.name)
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        values = _local.values
+        key = (self.name, labels)
+        # One slot per bucket plus +Inf, then sum and count
+        slots = values.get(key)
+        if slots is None:
+            slots = values[key] = [0] * (len(self.buckets) + 3)
+        slots[bisect_left(self.buckets, value)] += 1
+        slots[-2] += value
+        slots[-1] += 1
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, slots in sorted(_merged(self.name).items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), slots):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames + ("le",), labels + (bound,))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {slots[-2]}")
+            lines.append(f"{self.name}_count{label_text} {slots[-1]}")
+        return lines
+
+
+_registry: list = []
+
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+# HTTP
+request_duration = register(Histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route", "status")
+))
+requests_in_flight = register(Gauge(
+    "http_requests_in_flight", "Requests currently being served"
+))
+
+# Auth
+password_hash_duration = register(Histogram(
+    "password_hash_duration_seconds",
+    "Time to hash or verify a password on the hashing executor, including queueing",
+    ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+))
+token_refreshes = register(Counter(
+    "token_refreshes_total", "Expired access tokens seen by RefreshTokenMiddleware", ("result",)
+))
+
+# Database pool
+pool_checkouts = register(Counter(
+    "db_pool_checkouts_total", "Connections checked out of the pool", ("engine",)
+))
+pool_wait = register(Histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection", ("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+))
+_engines: Dict[str, object] = {}
+
+
+def _pool_state() -> Dict[tuple, float]:
+    state = {}
+    for name, engine in _engines.items():
+        # engine.pool is replaced by dispose(), so look it up on every scrape
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            continue  # single-connection pools (in-memory SQLite)
+        state[(name, "size")] = pool.size()
+        state[(name, "checkedout")] = pool.checkedout()
+        # QueuePool counts overflow from -size while the pool is filling up
+        state[(name, "overflow")] = max(pool.overflow(), 0)
+    return state
+
+
+register(Gauge(
+    "db_pool_connections", "Pool size, checked-out connections and overflow in use",
+    ("engine", "state"), callback=_pool_state,
+))
+
+
+def instrument_pool(name: str, engine):
+    """Count checkouts and expose the pool's state for a (sync) Engine."""
+    _engines[name] = engine
+    event.listen(engine, "checkout", lambda *args: pool_checkouts.inc(name))
+
+
+def timed_pool_class(pool_class, name: str):
+    """Subclass a QueuePool class so that waiting for a connection is timed."""
+
+    class TimedPool(pool_class):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                pool_wait.observe(time.perf_counter() - started, name)
+
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+
+def _status_class(status: int) -> str:
+    return f"{status // 100}xx"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency per route template and in-flight requests."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+        requests_in_flight.inc()
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            request_duration.observe(
+                time.perf_counter() - started, scope["method"], route, _status_class(status)
+            )
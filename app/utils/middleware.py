@@ -1,47 +1,104 @@
 # middleware.py
-from fastapi import Request, Response, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from http.cookies import SimpleCookie
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
 from jose import ExpiredSignatureError
+from starlette.datastructures import MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.utils.security import decode_access_token, decode_refresh_token, create_access_token
+from app.utils.metrics import token_refreshes
 
-class RefreshTokenMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        new_access_token = None
+
+class RefreshTokenMiddleware:
+    """Pure ASGI middleware that refreshes an expired access token.
+
+    Unlike BaseHTTPMiddleware it never wraps the app in a task or buffers the
+    response: requests without a Bearer token go straight through, and the
+    refreshed token is added to the headers of `http.response.start`.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
         # Извлекаем access token из заголовка (формат "Bearer <token>")
-        auth: str = request.headers.get("Authorization")
         token = None
-        if auth and auth.startswith("Bearer "):
-            token = auth.split(" ")[1]
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                auth = value.decode("latin-1")
+                if auth.startswith("Bearer "):
+                    token = auth.split(" ")[1]
+                break
+
+        # Анонимные запросы пропускаем без какой-либо работы с токенами
+        if not token:
+            await self.app(scope, receive, send)
+            return
 
-        if token:
+        state = scope.setdefault("state", {})
+        new_access_token = None
+        try:
+            # Пытаемся декодировать access token
+            user_id = decode_access_token(token)
+            # Передаём проверенную личность в get_current_user, чтобы не декодировать повторно
+            state["token_identity"] = (token, user_id)
+        except ExpiredSignatureError:
+            # Если access token истёк, ищем refresh token в cookie
+            refresh_token = self._get_cookie(scope, "refresh_token")
+            if not refresh_token:
+                token_refreshes.inc("missing_refresh_token")
+                await self._reject(
+                    scope, receive, send, "Access token expired. Refresh token required."
+                )
+                return
             try:
-                # Пытаемся декодировать access token
-                _ = decode_access_token(token)
-            except ExpiredSignatureError:
-                # Если access token истёк, ищем refresh token в cookie
-                refresh_token = request.cookies.get("refresh_token")
-                if refresh_token:
-                    try:
-                        # Проверяем refresh token
-                        user_id = decode_refresh_token(refresh_token)
-                        # Создаем новый access token
-                        new_access_token = create_access_token(user_id)
-                        # Сохраняем новый токен в request.state, чтобы зависимость его увидела
-                        request.state.new_access_token = new_access_token
-                        print("NEW ACCESS TOKEN GENERATED")
-                    except Exception as e:
-                        # Если refresh token недействителен, можно кинуть исключение или просто продолжить
-                        raise HTTPException(status_code=401, detail="Invalid refresh token")
-                else:
-                    raise HTTPException(status_code=401, detail="Access token expired. Refresh token required.")
-
-        # Продолжаем выполнение запроса
-        response: Response = await call_next(request)
-
-        # Если новый токен создан, устанавливаем его в куки и (опционально) в заголовок ответа
-        if new_access_token:
-            response.set_cookie(key="access_token", value=new_access_token, httponly=True, samesite="lax")
-            response.headers["X-New-Access-Token"] = new_access_token
-
-        return response
+                # Проверяем refresh token и создаем новый access token
+                user_id = decode_refresh_token(refresh_token)
+                new_access_token = create_access_token(user_id)
+            except HTTPException:
+                token_refreshes.inc("invalid_refresh_token")
+                await self._reject(scope, receive, send, "Invalid refresh token")
+                return
+            token_refreshes.inc("refreshed")
+            # Сохраняем новый токен в request.state, чтобы зависимость его увидела
+            state["new_access_token"] = new_access_token
+            print("NEW ACCESS TOKEN GENERATED")
+        except HTTPException as e:
+            await self._reject(scope, receive, send, e.detail)
+            return
+
+        if not new_access_token:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_token(message: Message):
+            # Устанавливаем новый токен в куки и в заголовок ответа
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                cookie = SimpleCookie()
+                cookie["access_token"] = new_access_token
+                cookie["access_token"]["path"] = "/"
+                cookie["access_token"]["httponly"] = True
+                cookie["access_token"]["samesite"] = "lax"
+                headers.append("set-cookie", cookie.output(header="").strip())
+                headers["X-New-Access-Token"] = new_access_token
+            await send(message)
+
+        await self.app(scope, receive, send_with_token)
+
+    @staticmethod
+    def _get_cookie(scope: Scope, name: str):
+        for header, value in scope["headers"]:
+            if header == b"cookie":
+                return cookie_parser(value.decode("latin-1")).get(name)
+        return None
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send, detail: str):
+        response = JSONResponse({"detail": detail}, status_code=401)
+        await response(scope, receive, send)
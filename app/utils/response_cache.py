@@ -0,0 +1,164 @@
+"""Read-through cache of serialized GET responses with ETag/Last-Modified.
+
+Entries are keyed by resource ("post:5", "comments:5") and dropped when a
+post_changed or comments_changed event is published for that post. Every
+drop also bumps a generation counter: a reader takes the generation before
+it queries the database and `store` skips the write when it has moved, so
+a body read while a write was committing is never cached after the write
+invalidated it.
+
+The backend is chosen by RESPONSE_CACHE_BACKEND: none (the default), a
+Redis-compatible server (shared by all workers, requires the `redis`
+package), or an in-process LRU. Events are only delivered inside the
+process that published them, so the memory backend is only correct with a
+single worker; with several workers each one would keep serving its own
+copy of a changed post until the TTL expires. Use redis for those.
+"""
+import hashlib
+import json
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+from ..config import get_settings
+from . import events
+from .cache import TTLCache
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int, ttl: int):
+        self._cache = TTLCache(max_entries, ttl)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: str) -> Optional[dict]:
+        return self._cache.get(key)
+
+    def set(self, key: str, entry: dict, generation: int):
+        with self._lock:
+            if generation == self._generation:
+                self._cache.set(key, entry)
+
+    def delete(self, *keys: str):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._cache.delete(key)
+
+
+# Set the entry only if the generation is unchanged, atomically on the server
+_SET_IF_CURRENT = """
+if (redis.call("GET", KEYS[1]) or "0") == ARGV[1] then
+    redis.call("SETEX", KEYS[2], ARGV[2], ARGV[3])
+end
+"""
+
+
+class RedisBackend:
+    GENERATION_KEY = "shanyrak:response-generation"
+
+    def __init__(self, url: str, ttl: int):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._ttl = ttl
+        self._set_if_current = self._client.register_script(_SET_IF_CURRENT)
+
+    def generation(self) -> int:
+        return int(self._client.get(self.GENERATION_KEY) or 0)
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self._client.get(f"shanyrak:response:{key}")
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, entry: dict, generation: int):
+        self._set_if_current(
+            keys=[self.GENERATION_KEY, f"shanyrak:response:{key}"],
+            args=[generation, self._ttl, json.dumps(entry)],
+        )
+
+    def delete(self, *keys: str):
+        pipeline = self._client.pipeline()
+        pipeline.incr(self.GENERATION_KEY)
+        pipeline.delete(*(f"shanyrak:response:{key}" for key in keys))
+        pipeline.execute()
+
+
+class NullBackend:
+    def generation(self) -> int:
+        return 0
+
+    def get(self, key: str) -> Optional[dict]:
+        return None
+
+    def set(self, key: str, entry: dict, generation: int):
+        pass
+
+    def delete(self, *keys: str):
+        pass
+
+
+def _create_backend():
+    settings = get_settings()
+    if settings.response_cache_backend == "redis":
+        return RedisBackend(settings.response_cache_url, settings.response_cache_ttl_seconds)
+    if settings.response_cache_backend == "memory":
+        return MemoryBackend(
+            settings.response_cache_max_entries, settings.response_cache_ttl_seconds
+        )
+    return NullBackend()
+
+
+response_cache = _create_backend()
+
+
+def _invalidate_post(post_id: int):
+    # A post's detail embeds its comment count, so both change together
+    response_cache.delete(f"post:{post_id}", f"comments:{post_id}")
+
+
+events.subscribe("post_changed", _invalidate_post)
+events.subscribe("comments_changed", _invalidate_post)
+
+
+def store(key: str, body: str, generation: int) -> dict:
+    """Cache a JSON body with its validators and return the entry.
+
+    `generation` is the value of response_cache.generation() taken before
+    the body was read; the entry is not cached if a write happened since.
+    """
+    entry = {
+        "body": body,
+        "etag": '"' + hashlib.sha1(body.encode()).hexdigest() + '"',
+        "last_modified": formatdate(time.time(), usegmt=True),
+    }
+    response_cache.set(key, entry, generation)
+    return entry
+
+
+def _not_modified(request: Request, entry: dict) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or entry["etag"] in tags or f"W/{entry['etag']}" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return parsedate_to_datetime(entry["last_modified"]) <= parsedate_to_datetime(
+                if_modified_since
+            )
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def respond(request: Request, entry: dict) -> Response:
+    """Return a 304 when the client's copy is current, otherwise the cached body."""
+    headers = {"ETag": entry["etag"], "Last-Modified": entry["last_modified"]}
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
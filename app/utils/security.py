@@ -1,57 +1,152 @@
 from fastapi import HTTPException, Request, Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt, ExpiredSignatureError
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from starlette import status
-from typing import Dict, Any
-import requests
-
-from ..config import (
-    SECRET_KEY,
-    REFRESH_SECRET_KEY,
-    ALGORITHM,
-    ACCESS_TOKEN_EXPIRE_MINUTES,
-    REFRESH_TOKEN_EXPIRE_DAYS,
-)
+from typing import Dict, Any, Optional, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import time
+from functools import lru_cache
+
+from ..config import get_settings
+from .cache import TTLCache
+from . import metrics
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """Build the passlib context on first use; loading passlib and the bcrypt
+    backend is a noticeable part of the import cost otherwise."""
+    from passlib.context import CryptContext
+
+    # Pinning min/max to the configured cost makes needs_update() flag hashes
+    # made with any other cost, so they are rehashed on the next login
+    rounds = get_settings().bcrypt_rounds
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/users/login")
+# Verified access token -> user ID; entries expire with the token's `exp`
+token_cache = TTLCache(
+    get_settings().token_cache_max_entries, get_settings().access_token_expire_minutes * 60
+)
 
 
 def hash_password(password: str) -> str:
     """Hash the user's password using bcrypt."""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify the hashed password matches the plain password."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verify the password and return a new hash if the stored one needs an update
+    (e.g. BCRYPT_ROUNDS changed since it was created)."""
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+# Password hashing runs on a dedicated, size-limited executor so a login burst
+# cannot occupy the request threadpool with CPU-bound bcrypt work.
+_hash_executor: Optional[Executor] = None
+_hash_in_flight = 0
+
+
+def _get_hash_executor() -> Executor:
+    global _hash_executor
+    if _hash_executor is None:
+        settings = get_settings()
+        if settings.password_hash_executor == "process":
+            _hash_executor = ProcessPoolExecutor(max_workers=settings.password_hash_workers)
+        else:
+            _hash_executor = ThreadPoolExecutor(
+                max_workers=settings.password_hash_workers, thread_name_prefix="password-hash"
+            )
+    return _hash_executor
+
+
+async def _run_hashing(fn, *args):
+    global _hash_in_flight
+    # Only touched from the event loop thread, so no lock is needed
+    _hash_in_flight += 1
+    started = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), fn, *args)
+    finally:
+        _hash_in_flight -= 1
+        metrics.password_hash_duration.observe(time.perf_counter() - started, fn.__name__)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash the password on the password hashing executor."""
+    return await _run_hashing(hash_password, password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Run verify_and_update_password on the password hashing executor."""
+    return await _run_hashing(verify_and_update_password, plain_password, hashed_password)
+
+
+metrics.register(metrics.Gauge(
+    "password_hash_in_flight", "Password hash/verify jobs running or queued on the executor",
+    callback=lambda: {(): _hash_in_flight},
+))
+metrics.register(metrics.Gauge(
+    "password_hash_queue_depth", "Password hash/verify jobs waiting for an executor worker",
+    callback=lambda: {(): max(_hash_in_flight - get_settings().password_hash_workers, 0)},
+))
 
 
 def create_access_token(user_id: int) -> str:
     """Create an access JWT token for the given user ID."""
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    settings = get_settings()
+    expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     to_encode = {"user_id": user_id, "exp": expire}
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
 
 def create_refresh_token(user_id: int) -> str:
     """Create a refresh JWT token for the given user ID."""
-    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    settings = get_settings()
+    expire = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
     to_encode = {"user_id": user_id, "exp": expire}
-    encoded_jwt = jwt.encode(to_encode, REFRESH_SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, settings.refresh_secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
 
 def decode_access_token(token: str) -> int:
-    """Decode the access JWT token and extract the user ID."""
+    """Decode the access JWT token and extract the user ID.
+
+    Verified tokens are cached until they expire, so repeated requests with
+    the same token skip signature verification.
+    """
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        settings = get_settings()
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         user_id: int = payload.get("user_id")
         if user_id is None:
             raise JWTError("Invalid token")
+        exp = payload.get("exp")
+        if exp is not None and exp > time.time():
+            token_cache.set(token, user_id, ttl=exp - time.time())
         return user_id
     except ExpiredSignatureError:
         raise ExpiredSignatureError("Access token expired")
@@ -62,7 +157,8 @@ def decode_access_token(token: str) -> int:
 def decode_refresh_token(token: str) -> int:
     """Decode the refresh JWT token and extract the user ID."""
     try:
-        payload = jwt.decode(token, REFRESH_SECRET_KEY, algorithms=[ALGORITHM])
+        settings = get_settings()
+        payload = jwt.decode(token, settings.refresh_secret_key, algorithms=[settings.algorithm])
         user_id: int = payload.get("user_id")
         if user_id is None:
             raise JWTError("Invalid refresh token")
@@ -79,6 +175,10 @@ async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status_code=401, detail="Missing access token")
+    # Reuse the identity RefreshTokenMiddleware already verified for this token
+    identity = getattr(request.state, "token_identity", None)
+    if identity is not None and identity[0] == token:
+        return {"user_id": identity[1], "access_token": token}
     try:
         user_id = decode_access_token(token)
         return {"user_id": user_id, "access_token": token}
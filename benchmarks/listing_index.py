@@ -0,0 +1,147 @@
+"""In-memory listing index vs SQL for type/rooms/price search pages.
+
+Seeds a fresh SQLite database, loads the listing index with NumPy columns
+(when numpy is installed) and with `array` module columns, and reports
+memory per listing and load time for each. Then times the same search
+pages (limit 20, exact totals) through PostRepository.get_posts with
+SEARCH_ENGINE=sql and with the index, and the index lookup on its own.
+Last, times single-listing upserts: most land in the overlay, and the
+slowest ones fold it into the columns.
+
+    python benchmarks/listing_index.py --posts 100000 --queries 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("REFRESH_SECRET_KEY", "benchmark")
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/listing_index.db"
+
+from sqlalchemy import insert
+
+from app.config import get_settings
+from app.database.database import Base, SessionLocal, engine
+from app.database.models import Post, PostType, User
+from app.repositories import listing_index, posts
+from app.repositories.listing_index import ListingIndex
+
+PAGE = 20
+
+# name -> (type, rooms_count, price_from, price_until)
+QUERIES = {
+    "unfiltered": (None, None, 0, None),
+    "type": ("rent", None, 0, None),
+    "type+rooms": ("buy", 2, 0, None),
+    "price range": (None, None, 1_000_000, 5_000_000),
+    "all filters": ("rent", 3, 500_000, 20_000_000),
+    "narrow": ("buy", 5, 90_000_000, 91_000_000),
+}
+
+
+def seed(count, rng):
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    db.add(User(username="bench@example.com", phone="+77010000000", password="x",
+                name="Bench", city="Almaty"))
+    db.flush()
+    for start in range(0, count, 10000):
+        db.execute(insert(Post), [
+            {"user_id": 1, "type": PostType.rent if rng.random() < 0.6 else PostType.buy,
+             "price": rng.randrange(50_000, 100_000_000, 1000), "address": f"Street {i}",
+             "area": 50, "rooms_count": rng.randint(1, 6), "description": "benchmark listing"}
+            for i in range(start, min(start + 10000, count))
+        ])
+    db.commit()
+    db.close()
+
+
+def load(index):
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        index.load(db)
+        return (time.perf_counter() - started) * 1000
+    finally:
+        db.close()
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=1000, help="Runs per query shape")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    seed(args.posts, rng)
+
+    indexes = {"array": ListingIndex(float("inf"), use_numpy=False)}
+    numpy_index = ListingIndex(float("inf"))
+    if numpy_index.use_numpy:
+        indexes["numpy"] = numpy_index
+    for name, index in indexes.items():
+        load_ms = load(index)
+        print(f"{name:<6} {len(index)} listings, {index.nbytes / len(index):.1f} bytes/listing "
+              f"({index.nbytes / 1024 / 1024:.2f} MiB), loaded in {load_ms:.0f} ms")
+
+    repository = posts.PostRepository()
+    db = SessionLocal()
+    print(f"\n{'query':<12} {'engine':<12} {'p50 ms':>8} {'p95 ms':>8}")
+    try:
+        for name, (type, rooms_count, price_from, price_until) in QUERIES.items():
+            def page(engine_name):
+                # Settings are read per call, so switching needs a reload
+                os.environ["SEARCH_ENGINE"] = engine_name
+                get_settings.cache_clear()
+                return lambda: repository.get_posts(
+                    db, PAGE, rng.randrange(0, 200, PAGE), type, rooms_count,
+                    price_from, price_until, total="exact",
+                )
+
+            posts.count_cache.clear()
+            results = {"sql": timed(page("sql"), args.queries)}
+            for index_name, index in indexes.items():
+                listing_index.listing_index = index
+                results[f"{index_name}+rows"] = timed(page("memory"), args.queries)
+                results[f"{index_name} ids"] = timed(
+                    lambda: index.search(type, rooms_count, price_from, price_until,
+                                         None, rng.randrange(0, 200, PAGE), PAGE + 1),
+                    args.queries,
+                )
+            for engine_name, (p50, p95) in results.items():
+                print(f"{name:<12} {engine_name:<12} {p50:8.3f} {p95:8.3f}")
+    finally:
+        db.close()
+
+    print(f"\n{'writes':<12} {'engine':<12} {'mean ms':>8} {'p50 ms':>8} {'max ms':>8}")
+    for index_name, index in indexes.items():
+        samples = []
+        for _ in range(args.queries):
+            listing = (rng.randrange(1, args.posts), "rent", 2,
+                       rng.randrange(50_000, 100_000_000, 1000))
+            started = time.perf_counter()
+            index.upsert([listing])
+            samples.append((time.perf_counter() - started) * 1000)
+        print(f"{'upsert':<12} {index_name:<12} {statistics.mean(samples):8.3f} "
+              f"{statistics.median(samples):8.3f} {max(samples):8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Requests per second through RefreshTokenMiddleware vs its BaseHTTPMiddleware version.
+
+The baseline is the RefreshTokenMiddleware the app used before it became
+pure ASGI middleware, copied below unchanged apart from its comments, so
+both sides do the same token work. A tiny endpoint keeps the middleware
+overhead visible.
+
+    python benchmarks/middleware.py --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("REFRESH_SECRET_KEY", "benchmark")
+
+import httpx
+from fastapi import HTTPException, Request, Response
+from jose import ExpiredSignatureError
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.utils.middleware import RefreshTokenMiddleware
+from app.utils.security import create_access_token, decode_access_token, decode_refresh_token
+
+
+class BaseHTTPRefreshTokenMiddleware(BaseHTTPMiddleware):
+    """RefreshTokenMiddleware as it was before the pure ASGI rewrite."""
+
+    async def dispatch(self, request: Request, call_next):
+        new_access_token = None
+
+        auth: str = request.headers.get("Authorization")
+        token = None
+        if auth and auth.startswith("Bearer "):
+            token = auth.split(" ")[1]
+
+        if token:
+            try:
+                user_id = decode_access_token(token)
+                request.state.token_identity = (token, user_id)
+            except ExpiredSignatureError:
+                refresh_token = request.cookies.get("refresh_token")
+                if refresh_token:
+                    try:
+                        user_id = decode_refresh_token(refresh_token)
+                        new_access_token = create_access_token(user_id)
+                        request.state.new_access_token = new_access_token
+                        print("NEW ACCESS TOKEN GENERATED")
+                    except Exception as e:
+                        raise HTTPException(status_code=401, detail="Invalid refresh token")
+                else:
+                    raise HTTPException(status_code=401, detail="Access token expired. Refresh token required.")
+
+        response: Response = await call_next(request)
+
+        if new_access_token:
+            response.set_cookie(key="access_token", value=new_access_token, httponly=True, samesite="lax")
+            response.headers["X-New-Access-Token"] = new_access_token
+
+        return response
+
+
+async def endpoint(request):
+    return PlainTextResponse("ok")
+
+
+def build_app(middleware_class=None):
+    middleware = [Middleware(middleware_class)] if middleware_class else []
+    return Starlette(routes=[Route("/", endpoint)], middleware=middleware)
+
+
+async def measure(app, requests, concurrency, headers):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+
+        async def client(count):
+            for _ in range(count):
+                await http.get("/", headers=headers)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(requests // concurrency) for _ in range(concurrency)))
+        return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    token = create_access_token(1)
+    cases = [
+        ("no middleware", None),
+        ("RefreshTokenMiddleware (BaseHTTP)", BaseHTTPRefreshTokenMiddleware),
+        ("RefreshTokenMiddleware (ASGI)", RefreshTokenMiddleware),
+    ]
+    for traffic, headers in (("anonymous", {}), ("bearer", {"Authorization": f"Bearer {token}"})):
+        for name, middleware_class in cases:
+            rps = asyncio.run(
+                measure(build_app(middleware_class), args.requests, args.concurrency, headers)
+            )
+            print(f"{traffic:<10} {name:<34} {rps:>10.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
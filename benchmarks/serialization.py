@@ -0,0 +1,110 @@
+"""Cost of building a 100-row search page: ORM + double validation vs the fast path.
+
+"orm" is the previous search_posts path: full ORM instances, one
+SearchShanyrak per row from `post.__dict__`, then FastAPI's response_model
+validation and JSON encoding of the whole SearchShanyrakList. "rows" is the
+current path: a column-only select, from_attributes validation, and
+ORJSONResponse rendering. The end-to-end figure drives GET /shanyraks/ with
+limit=100 through the app.
+
+    python benchmarks/serialization.py --pages 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("REFRESH_SECRET_KEY", "benchmark")
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/serialization.db"
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+
+from app.database.database import Base, SessionLocal, engine
+from app.database.models import Post, PostType, User
+from app.main import app
+from app.repositories.posts import PostRepository
+from app.schemas.posts import SearchShanyrak, SearchShanyrakList
+
+PAGE = 100
+
+
+def seed(posts):
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    db.add(User(username="bench@example.com", phone="+77010000000", password="x",
+                name="Bench", city="Almaty"))
+    db.flush()
+    db.execute(insert(Post), [
+        {"user_id": 1, "type": PostType.rent if i % 2 else PostType.buy,
+         "price": 1000 * (i % 500), "address": f"Street {i}", "area": 30 + i % 90,
+         "rooms_count": i % 5, "description": "benchmark listing"}
+        for i in range(posts)
+    ])
+    db.commit()
+    db.close()
+
+
+def orm_page(db, offset):
+    posts = db.query(Post).order_by(Post.id).offset(offset).limit(PAGE).all()
+    objects = [SearchShanyrak.model_validate(post.__dict__) for post in posts]
+    page = SearchShanyrakList(total=None, objects=objects, next_cursor=None)
+    # What FastAPI's serialize_response does with response_model
+    validated = TypeAdapter(SearchShanyrakList).validate_python(page, from_attributes=True)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def rows_page(db, offset, repository=PostRepository()):
+    posts, total, next_cursor = repository.get_posts(
+        db, PAGE, offset, None, None, 0, None, total="none"
+    )
+    objects = [SearchShanyrak.model_validate(post).model_dump() for post in posts]
+    return ORJSONResponse({"total": total, "objects": objects, "next_cursor": next_cursor}).body
+
+
+def measure(build, pages, posts):
+    db = SessionLocal()
+    try:
+        build(db, 0)  # warm up
+        started = time.perf_counter()
+        for i in range(pages):
+            build(db, (i * PAGE) % (posts - PAGE))
+        return (time.perf_counter() - started) / pages * 1000
+    finally:
+        db.close()
+
+
+async def end_to_end(pages):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        started = time.perf_counter()
+        for i in range(pages):
+            response = await http.get("/shanyraks/", params={"limit": PAGE, "total": "none"})
+            response.raise_for_status()
+        return (time.perf_counter() - started) / pages * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--pages", type=int, default=1000)
+    args = parser.parse_args()
+
+    seed(args.posts)
+    orm = measure(orm_page, args.pages, args.posts)
+    rows = measure(rows_page, args.pages, args.posts)
+    print(f"orm + double validation  {orm:8.3f} ms/page")
+    print(f"rows + orjson            {rows:8.3f} ms/page  ({orm / rows:.2f}x)")
+    print(f"GET /shanyraks/?limit=100 {asyncio.run(end_to_end(args.pages // 4)):7.3f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Mixed read/write throughput on SQLite with and without the WAL pragmas.
+
+Reader threads page through search results while writer threads add
+comments and favorites through the repositories, the same write paths the
+API uses. Each mode runs in its own process against a fresh database file.
+
+    python benchmarks/sqlite_wal.py --seconds 10 --readers 8 --writers 2
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def run_worker(args):
+    sys.path.insert(0, str(ROOT))
+    from fastapi import HTTPException
+    from app.database.database import Base, SessionLocal, engine
+    from app.database.models import Post, PostType, User
+    from app.repositories.comments import CommentRepository
+    from app.repositories.posts import PostRepository
+    from app.repositories.users import UsersRepository
+    from app.schemas.comments import CommentCreate
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    users = [
+        User(username=f"bench{i}@example.com", phone=f"+7701000{i:04d}", password="x",
+             name="Bench", city="Almaty")
+        for i in range(args.writers)
+    ]
+    db.add_all(users)
+    db.flush()
+    db.add_all(
+        Post(user_id=users[0].id, type=PostType.rent if i % 2 else PostType.buy,
+             price=1000 * (i % 500), address=f"Street {i}", area=30 + i % 90,
+             rooms_count=i % 5, description="benchmark listing")
+        for i in range(args.posts)
+    )
+    db.commit()
+    user_ids = [user.id for user in users]
+    db.close()
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def reader():
+        posts = PostRepository()
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            db = SessionLocal()
+            try:
+                posts.get_posts(db, 20, (done * 20) % args.posts, "rent", None, 0, None,
+                                total="exact")
+                done += 1
+            except Exception:
+                errors += 1
+            finally:
+                db.close()
+        with lock:
+            counts["reads"] += done
+            counts["errors"] += errors
+
+    def writer(user_id):
+        comments = CommentRepository()
+        favorites = UsersRepository()
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            db = SessionLocal()
+            post_id = done % args.posts + 1
+            try:
+                comments.create_comment(db, user_id, post_id, CommentCreate(content="bench"))
+                try:
+                    favorites.add_to_favorites(db, user_id, post_id)
+                except HTTPException:
+                    pass  # already a favorite on a later lap
+                done += 2
+            except Exception:
+                errors += 1
+            finally:
+                db.close()
+        with lock:
+            counts["writes"] += done
+            counts["errors"] += errors
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(uid,)) for uid in user_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(json.dumps({
+        "wal": os.environ["SQLITE_WAL"] == "true",
+        "reads_per_s": round(counts["reads"] / args.seconds, 1),
+        "writes_per_s": round(counts["writes"] / args.seconds, 1),
+        "errors": counts["errors"],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    env = dict(os.environ)
+    env.setdefault("SECRET_KEY", "benchmark")
+    env.setdefault("REFRESH_SECRET_KEY", "benchmark")
+    for wal in ("false", "true"):
+        workdir = tempfile.mkdtemp(prefix="shanyrak-bench-")
+        command = [
+            sys.executable, str(Path(__file__).resolve()), "--worker",
+            "--posts", str(args.posts), "--seconds", str(args.seconds),
+            "--readers", str(args.readers), "--writers", str(args.writers),
+        ]
+        result = subprocess.run(
+            command, cwd=workdir, env={**env, "SQLITE_WAL": wal},
+            capture_output=True, text=True, check=True,
+        )
+        print(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Shared fixtures: one temporary SQLite database for the whole run.
+
+The environment is set before anything from `app` is imported, because the
+engine is created from the settings when app.database is first imported.
+"""
+import os
+import tempfile
+
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("REFRESH_SECRET_KEY", "test")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ["DATABASE_BACKEND"] = "sync"
+os.environ["SEARCH_ENGINE"] = "sql"
+os.environ["RESPONSE_CACHE_BACKEND"] = "none"
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+
+import pytest
+from sqlalchemy import event
+
+from app.database import models  # noqa: F401  registers the tables
+from app.database.database import Base, SessionLocal, engine
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    Base.metadata.create_all(engine)
+    yield
+    engine.dispose()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def statements():
+    """SQL statements (text, parameters) sent while the test runs."""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    yield captured
+    event.remove(engine, "before_cursor_execute", capture)
+
+
+def explain(statement: str, parameters) -> list:
+    """The detail column of EXPLAIN QUERY PLAN for one captured statement."""
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
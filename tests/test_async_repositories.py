@@ -0,0 +1,123 @@
+"""The async repositories' awaited reads return what the sync repositories do.
+
+An AsyncSession on the test database (through aiosqlite) runs search,
+post and comment reads next to the sync repositories on a Session.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.database.database import engine
+from app.database.models import User
+from app.repositories.aio import AsyncCommentRepository, AsyncPostRepository
+from app.repositories.comments import CommentRepository
+from app.repositories.posts import PostRepository
+from app.schemas.comments import CommentCreate
+from app.schemas.posts import PostCreate
+from app.utils.pagination import encode_cursor
+
+pytest.importorskip("aiosqlite")
+
+SEARCHES = [
+    dict(type=None, rooms_count=None, price_from=0, price_until=None),
+    dict(type="rent", rooms_count=None, price_from=0, price_until=None),
+    dict(type="rent", rooms_count=2, price_from=1000, price_until=5000),
+    dict(type=None, rooms_count=None, price_from=0, price_until=None, sort="-price"),
+    dict(type=None, rooms_count=None, price_from=0, price_until=None, q="async"),
+]
+
+
+@pytest.fixture(scope="module")
+def post_ids():
+    from app.database.database import SessionLocal
+
+    db = SessionLocal()
+    user = User(username="async@example.com", phone="+77015550303", password="x",
+                name="Async", city="Almaty")
+    db.add(user)
+    db.commit()
+    repository = PostRepository()
+    ids = [
+        repository.create_post(db, user.id, PostCreate(
+            type="rent" if i % 2 else "buy", price=1000 * (i + 1),
+            address=f"Async street {i}", area=40, rooms_count=i % 3,
+            description="async listing",
+        ))
+        for i in range(8)
+    ]
+    comments = CommentRepository()
+    for i in range(3):
+        comments.create_comment(db, user.id, ids[0], CommentCreate(content=f"comment {i}"))
+    db.close()
+    return ids
+
+
+def run_async(call):
+    """Run `call(session)` on an AsyncSession of the test database."""
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    async def main():
+        async_engine = create_async_engine(
+            engine.url.set(drivername="sqlite+aiosqlite")
+        )
+        try:
+            async with AsyncSession(async_engine) as session:
+                return await call(session)
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("search", SEARCHES)
+def test_search_pages_match(db, post_ids, search):
+    search = dict(search)
+    search.setdefault("sort", None)
+    search.setdefault("q", None)
+
+    def get_posts(repository, session, cursor=None):
+        return repository.get_posts(
+            session, 3, 0, search["type"], search["rooms_count"], search["price_from"],
+            search["price_until"], cursor, "exact", search["q"], sort=search["sort"],
+        )
+
+    first = get_posts(PostRepository(), db)
+    assert run_async(lambda session: get_posts(AsyncPostRepository(), session)) == first
+    if first[2] is not None:
+        assert run_async(
+            lambda session: get_posts(AsyncPostRepository(), session, first[2])
+        ) == get_posts(PostRepository(), db, first[2])
+
+
+def test_post_reads_match(db, post_ids):
+    sync, aio = PostRepository(), AsyncPostRepository()
+    assert run_async(lambda session: aio.get_post_by_id(session, post_ids[0])) == (
+        sync.get_post_by_id(db, post_ids[0])
+    )
+    assert run_async(lambda session: aio.get_posts_by_ids(session, post_ids[:3])) == (
+        sync.get_posts_by_ids(db, post_ids[:3])
+    )
+    with pytest.raises(HTTPException) as error:
+        run_async(lambda session: aio.get_post_by_id(session, 999999))
+    assert error.value.status_code == 404
+
+
+def test_comment_pages_match(db, post_ids):
+    sync, aio = CommentRepository(), AsyncCommentRepository()
+    expected = sync.get_comment_by_post_id(db, post_ids[0], 2)
+    assert expected[1] is not None
+    assert run_async(lambda session: aio.get_comment_by_post_id(session, post_ids[0], 2)) == (
+        expected
+    )
+    assert run_async(
+        lambda session: aio.get_comment_by_post_id(session, post_ids[0], 2, expected[1])
+    ) == sync.get_comment_by_post_id(db, post_ids[0], 2, expected[1])
+    with pytest.raises(HTTPException) as error:
+        run_async(lambda session: aio.get_comment_by_post_id(session, 999999, 2))
+    assert error.value.status_code == 404
+    with pytest.raises(HTTPException) as error:
+        run_async(lambda session: aio.get_comment_by_post_id(
+            session, post_ids[0], 2, encode_cursor("not a date", 1)
+        ))
+    assert error.value.status_code == 400
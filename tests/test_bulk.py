@@ -0,0 +1,36 @@
+"""Bulk import parsing reports undecodable lines as row errors."""
+import asyncio
+
+from app.utils import bulk
+
+
+def records(body: bytes, content_type: str, chunk_size: int = 7):
+    async def stream():
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+
+    async def collect():
+        return [item async for item in bulk.iter_records(stream(), content_type)]
+
+    return asyncio.run(collect())
+
+
+def test_invalid_utf8_ndjson_line_is_a_row_error():
+    body = '{"a": 1}\n'.encode() + b'{"a": "\xff"}\n' + '{"a": "Алматы"}\n'.encode()
+    (row1, first), (row2, error), (row3, third) = records(body, bulk.NDJSON)
+    assert (row1, first) == (1, {"a": 1})
+    assert row2 == 2 and isinstance(error, ValueError)
+    assert (row3, third) == (3, {"a": "Алматы"})
+
+
+def test_invalid_utf8_csv_row_is_a_row_error():
+    body = b"a,b\n1,2\n\xfe,3\n4,5\n"
+    rows = records(body, bulk.CSV)
+    assert rows[0] == (1, {"a": "1", "b": "2"})
+    assert rows[1][0] == 2 and isinstance(rows[1][1], ValueError)
+    assert rows[2] == (3, {"a": "4", "b": "5"})
+
+
+def test_invalid_utf8_csv_header_stops_the_upload():
+    rows = records(b"a,\xfe\n1,2\n", bulk.CSV)
+    assert len(rows) == 1 and rows[0][0] == 0 and isinstance(rows[0][1], ValueError)
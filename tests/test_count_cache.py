@@ -0,0 +1,49 @@
+"""The search count cache does not keep a total counted before a write."""
+from sqlalchemy import event
+
+from app.database.database import SessionLocal, engine
+from app.database.models import User
+from app.repositories.posts import PostRepository, count_cache
+from app.schemas.posts import PostCreate
+
+FILTERS_KEY = ("rent", 3, 0, None, None, None, None, None)
+
+
+def create_post(address):
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == "counts@example.com").first()
+        if user is None:
+            user = User(username="counts@example.com", phone="+77015550404", password="x",
+                        name="Counts", city="Almaty")
+            db.add(user)
+            db.commit()
+        PostRepository().create_post(db, user.id, PostCreate(
+            type="rent", price=1000, address=address, area=40, rooms_count=3,
+            description="count listing",
+        ))
+    finally:
+        db.close()
+
+
+def test_count_is_not_cached_after_a_concurrent_write(db):
+    written = []
+
+    def write_after_count(conn, cursor, statement, parameters, context, executemany):
+        if not written and statement.lstrip().upper().startswith("SELECT COUNT"):
+            # Another request commits a matching post once the total is read
+            written.append(statement)
+            create_post("Count street 2")
+
+    create_post("Count street 1")
+    event.listen(engine, "after_cursor_execute", write_after_count)
+    try:
+        PostRepository().get_posts(db, 5, 0, "rent", 3, 0, None, total="estimate")
+    finally:
+        event.remove(engine, "after_cursor_execute", write_after_count)
+    assert written
+    assert count_cache.get(FILTERS_KEY) is None
+
+    db.rollback()
+    _, total, _ = PostRepository().get_posts(db, 5, 0, "rent", 3, 0, None, total="estimate")
+    assert count_cache.get(FILTERS_KEY) == total
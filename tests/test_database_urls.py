@@ -0,0 +1,17 @@
+"""The sync engine must use the async backend's database."""
+import pytest
+
+from app.database.database import same_database
+
+
+@pytest.mark.parametrize("sync_url, async_url, same", [
+    ("sqlite:///./sql_app.db", "sqlite+aiosqlite:///./sql_app.db", True),
+    ("sqlite:///./sql_app.db", "sqlite+aiosqlite:///sql_app.db", True),
+    ("sqlite:///./sql_app.db", "sqlite+aiosqlite:///./other.db", False),
+    ("sqlite://", "sqlite+aiosqlite://", False),
+    ("postgresql://app@db:5432/shanyrak", "postgresql+asyncpg://app@db:5432/shanyrak", True),
+    ("postgresql://app@db/shanyrak", "postgresql+asyncpg://app@replica/shanyrak", False),
+    ("sqlite:///./sql_app.db", "postgresql+asyncpg://app@db/shanyrak", False),
+])
+def test_same_database_ignores_the_driver(sync_url, async_url, same):
+    assert same_database(sync_url, async_url) is same
@@ -0,0 +1,53 @@
+"""Import-time budget for the application (cold start of a worker).
+
+Runs `python -X importtime -c "import app.main"` in fresh interpreters and
+fails when the median total goes over the budget, or when a module that
+must stay lazy is imported. Set IMPORT_TIME_BUDGET_MS for slower machines.
+"""
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+RUNS = 3
+
+# Loaded on first password hash, only with SEARCH_ENGINE=memory, or never
+# (requests is unused)
+LAZY_MODULES = ("passlib", "numpy", "requests")
+
+
+def import_timings(module: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+@pytest.fixture(scope="module")
+def runs():
+    return [import_timings("app.main") for _ in range(RUNS)]
+
+
+def test_lazy_modules_are_not_imported(runs):
+    eager = sorted(name for name in runs[-1] if name.split(".")[0] in LAZY_MODULES)
+    assert not eager, f"imported eagerly: {', '.join(eager)}"
+
+
+def test_import_time_within_budget(runs):
+    median = statistics.median(run["app.main"][1] / 1000 for run in runs)
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1][0], reverse=True)[:10]
+    report = "\n".join(f"{self_us / 1000:8.1f} ms  {name}" for name, (self_us, _) in slowest)
+    assert median <= BUDGET_MS, f"median {median:.0f} ms over {BUDGET_MS:.0f} ms\n{report}"
@@ -0,0 +1,70 @@
+"""ListingIndex answers like a brute-force filter while writes go through its overlay.
+
+Random upserts and removals are applied to the index and to a plain dict,
+with a small OVERLAY_SIZE so the overlay is also folded into the columns,
+and every search is compared with filtering the dict.
+"""
+import random
+
+import pytest
+from sqlalchemy import String, select, type_coerce
+
+from app.database.models import Post
+from app.repositories import listing_index
+from app.repositories.listing_index import ListingIndex
+
+SEARCHES = 200
+
+
+def expected(listings, type, rooms_count, price_from, price_until, after_id, offset, limit):
+    matched = sorted(
+        post_id for post_id, (post_type, post_rooms, price) in listings.items()
+        if (type is None or post_type == type)
+        and (rooms_count is None or post_rooms == rooms_count)
+        and price >= price_from
+        and (price_until is None or price <= price_until)
+    )
+    start = 0 if after_id is not None else offset
+    page = [post_id for post_id in matched if after_id is None or post_id > after_id]
+    return page[start:start + limit], len(matched)
+
+
+@pytest.mark.parametrize("use_numpy", [False, True], ids=["array", "numpy"])
+@pytest.mark.parametrize("overlay_size", [4, 256])
+def test_search_matches_after_writes(db, monkeypatch, use_numpy, overlay_size):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    monkeypatch.setattr(listing_index, "OVERLAY_SIZE", overlay_size)
+    index = ListingIndex(float("inf"), use_numpy=use_numpy)
+    index.load(db)
+    listings = {
+        post_id: (post_type, rooms, price)
+        for post_id, post_type, rooms, price in db.execute(
+            select(Post.id, type_coerce(Post.type, String), Post.rooms_count, Post.price)
+        )
+    }
+    rng = random.Random(overlay_size)
+
+    for _ in range(SEARCHES):
+        if rng.random() < 0.3 and listings:
+            removed = rng.sample(sorted(listings), min(len(listings), rng.randint(1, 3)))
+            index.remove(removed)
+            for post_id in removed:
+                del listings[post_id]
+        else:
+            written = [
+                (rng.randint(1, 600), rng.choice(["rent", "buy"]), rng.randint(0, 3),
+                 rng.randrange(0, 10000, 250))
+                for _ in range(rng.randint(1, 3))
+            ]
+            index.upsert(written)
+            for post_id, post_type, rooms, price in written:
+                listings[post_id] = (post_type, rooms, price)
+
+        search = (
+            rng.choice([None, "rent", "buy"]), rng.choice([None, 0, 2]),
+            rng.choice([0, 0, 2500]), rng.choice([None, None, 5000, 250]),
+            rng.choice([None, None, rng.randint(1, 600)]), rng.choice([0, 3]), 5,
+        )
+        assert index.search(*search) == expected(listings, *search), search
+    assert len(index) == len(listings)
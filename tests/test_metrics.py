@@ -0,0 +1,24 @@
+"""Per-thread metric shards are folded into the totals when threads exit."""
+import threading
+
+from app.utils import metrics
+
+
+def test_exited_threads_keep_their_counts_but_not_their_shards():
+    counter = metrics.Counter("test_thread_counter_total", "test")
+    histogram = metrics.Histogram("test_thread_seconds", "test")
+    live_shards = len(metrics._shards)
+
+    def work():
+        for _ in range(10):
+            counter.inc("a")
+            histogram.observe(0.01)
+
+    for _ in range(50):
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+
+    assert len(metrics._shards) == live_shards
+    assert metrics._merged(counter.name) == {("a",): 500}
+    assert metrics._merged(histogram.name)[()][-1] == 500
@@ -0,0 +1,93 @@
+"""SQL statement budget per write endpoint.
+
+Each case drives one comment or favorites request, including the failure
+paths (not found, forbidden), and counts the statements it sends. The
+owner created the post; "their" comment is the owner's own, "other" is
+the one left by the other user.
+"""
+from itertools import count
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database.models import User
+from app.main import app
+from app.repositories.comments import CommentRepository
+from app.repositories.posts import PostRepository
+from app.repositories.users import UsersRepository
+from app.schemas.comments import CommentCreate
+from app.schemas.posts import PostCreate
+
+# (label, client, method, path, expected status, statement budget, favorited first)
+BUDGETS = [
+    ("create comment", "owner", "post", "/shanyraks/{post}/comments", 200, 2, False),
+    ("create comment, unknown post", "owner", "post", "/shanyraks/999999/comments", 404, 1, False),
+    ("update comment", "owner", "patch", "/shanyraks/{post}/comments/{own}?content=edited", 200, 1, False),
+    ("update comment, not author", "owner", "patch", "/shanyraks/{post}/comments/{other}?content=x", 403, 2, False),
+    ("update comment, unknown", "owner", "patch", "/shanyraks/{post}/comments/999999?content=x", 404, 2, False),
+    ("delete comment, not author", "other", "delete", "/shanyraks/{post}/comments/{own}", 403, 2, False),
+    ("delete comment", "owner", "delete", "/shanyraks/{post}/comments/{own}", 200, 2, False),
+    ("delete comment, post owner", "owner", "delete", "/shanyraks/{post}/comments/{other}", 200, 2, False),
+    ("add favorite", "owner", "post", "/auth/users/favorites/shanyraks/{post}", 200, 1, False),
+    ("add favorite, duplicate", "owner", "post", "/auth/users/favorites/shanyraks/{post}", 400, 1, True),
+    ("add favorite, unknown post", "owner", "post", "/auth/users/favorites/shanyraks/999999", 404, 2, False),
+    ("delete favorite", "owner", "delete", "/auth/users/favorites/shanyraks/{post}", 200, 1, True),
+]
+
+addresses = (f"Budget street {number}" for number in count(1))
+
+
+def sign_up(username, phone):
+    client = TestClient(app)
+    client.post(
+        "/auth/users",
+        json={"username": username, "phone": phone, "password": "pw",
+              "name": "Budget", "city": "Almaty"},
+    )
+    response = client.post("/auth/users/login", data={"username": username, "password": "pw"})
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    return client
+
+
+@pytest.fixture(scope="module")
+def clients():
+    return {
+        "owner": sign_up("owner@example.com", "+77011234567"),
+        "other": sign_up("other@example.com", "+77017654321"),
+    }
+
+
+@pytest.fixture
+def listing(db, clients):
+    """A fresh post by the owner with one comment from each user."""
+    owner = db.query(User).filter(User.username == "owner@example.com").one()
+    other = db.query(User).filter(User.username == "other@example.com").one()
+    post = PostRepository().create_post(db, owner.id, PostCreate(
+        type="rent", price=1000, address=next(addresses), area=40,
+        rooms_count=2, description="budget listing",
+    ))
+    comments = CommentRepository()
+    return {
+        "owner_id": owner.id,
+        "post": post,
+        "other": comments.create_comment(db, other.id, post, CommentCreate(content="setup")),
+        "own": comments.create_comment(db, owner.id, post, CommentCreate(content="mine")),
+    }
+
+
+@pytest.mark.parametrize(
+    "client, method, path, status, budget, favorited",
+    [case[1:] for case in BUDGETS],
+    ids=[case[0] for case in BUDGETS],
+)
+def test_statement_budget(
+    db, clients, listing, statements, client, method, path, status, budget, favorited
+):
+    if favorited:
+        UsersRepository().add_to_favorites(db, listing["owner_id"], listing["post"])
+    kwargs = {"json": {"content": "budget"}} if path.endswith("/comments") else {}
+    statements.clear()
+    response = getattr(clients[client], method)(path.format(**listing), **kwargs)
+    assert response.status_code == status, response.text
+    sent = [" ".join(statement.split()) for statement, _ in statements]
+    assert len(sent) <= budget, "\n".join(sent)
@@ -0,0 +1,125 @@
+"""EXPLAIN QUERY PLAN regression tests for the repository queries.
+
+Every search filter combination (first page, cursor page and the total
+count), the create_post duplicate check and the comment listing must be
+answered through an index: a plan step that scans posts or comments
+fails the test, so dropping or renaming one of the search indexes shows
+up here. Pages must also come out of the index in their order: a "USE
+TEMP B-TREE FOR ORDER BY" step sorts every matching row before the first
+one is returned, so it fails too. The one allowed scan is a page filtered
+only by price, which walks posts in id order until LIMIT rows match,
+like the unfiltered page.
+"""
+from itertools import product
+
+import pytest
+from fastapi import HTTPException
+
+from app.database.models import User
+from app.repositories.comments import CommentRepository
+from app.repositories.posts import PostRepository
+from app.schemas.posts import PostCreate
+from app.utils.pagination import encode_cursor
+
+from .conftest import explain
+
+# type, rooms_count, price_from, price_until; price_from=0 is "no lower bound"
+FILTERS = [
+    combination
+    for combination in product([None, "rent"], [None, 2], [0, 1000], [None, 5000])
+    if any(combination)
+]
+
+
+def select_plans(statements):
+    captured = list(statements)
+    selects = [
+        (statement, parameters) for statement, parameters in captured
+        if statement.lstrip().upper().startswith("SELECT")
+    ]
+    assert selects, "no SELECT statement was sent"
+    return [(" ".join(statement.split()), explain(statement, parameters))
+            for statement, parameters in selects]
+
+
+def is_page(statement: str) -> bool:
+    return " ORDER BY " in statement and " LIMIT " in statement
+
+
+def assert_indexed(statements, page_walks_ids: bool = False):
+    """Fail on table scans, and on sorts in page statements.
+
+    With `page_walks_ids`, the page statement may scan posts in id order.
+    """
+    for statement, plan in select_plans(statements):
+        scans = [step for step in plan if step.startswith(("SCAN posts", "SCAN comments"))]
+        if page_walks_ids and is_page(statement):
+            scans = [step for step in scans if step != "SCAN posts"]
+        assert not scans, f"{statement}\n{plan}"
+        if is_page(statement):
+            sorts = [step for step in plan if "TEMP B-TREE FOR ORDER BY" in step]
+            assert not sorts, f"{statement}\n{plan}"
+
+
+@pytest.fixture(scope="module")
+def user_id():
+    from app.database.database import SessionLocal
+
+    db = SessionLocal()
+    user = User(username="plans@example.com", phone="+77015550101", password="x",
+                name="Plans", city="Almaty")
+    db.add(user)
+    db.commit()
+    try:
+        yield user.id
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="module")
+def post_id(user_id):
+    from app.database.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        yield PostRepository().create_post(db, user_id, PostCreate(
+            type="rent", price=1500, address="Plan street 1", area=40,
+            rooms_count=2, description="plan listing",
+        ))
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("type, rooms_count, price_from, price_until", FILTERS)
+@pytest.mark.parametrize("cursor", [None, encode_cursor(1)], ids=["first", "cursor"])
+def test_search_filters_use_an_index(
+    db, statements, type, rooms_count, price_from, price_until, cursor
+):
+    PostRepository().get_posts(
+        db, 5, 0, type, rooms_count, price_from, price_until, cursor, total="exact"
+    )
+    assert_indexed(statements, page_walks_ids=type is None and rooms_count is None)
+
+
+def test_unfiltered_search_walks_ids_without_sorting(db, statements):
+    # With no filter the page reads posts in rowid order and stops at LIMIT
+    PostRepository().get_posts(db, 5, 0, None, None, 0, None, total="none")
+    for statement, plan in select_plans(statements):
+        assert not any("TEMP B-TREE" in step for step in plan), f"{statement}\n{plan}"
+
+
+def test_duplicate_post_check_uses_an_index(db, statements, user_id, post_id):
+    with pytest.raises(HTTPException) as error:
+        PostRepository().create_post(db, user_id, PostCreate(
+            type="rent", price=1500, address="Plan street 1", area=40,
+            rooms_count=2, description="plan listing",
+        ))
+    assert error.value.status_code == 400
+    assert_indexed(statements)
+
+
+@pytest.mark.parametrize("cursor", [None, encode_cursor("2026-01-01T00:00:00", 1)],
+                         ids=["first", "cursor"])
+def test_comments_by_post_use_an_index(db, statements, post_id, cursor):
+    CommentRepository().get_comment_by_post_id(db, post_id, 20, cursor)
+    assert_indexed(statements)
@@ -0,0 +1,14 @@
+"""The response cache does not keep a body read before an invalidating write."""
+from app.utils.response_cache import MemoryBackend
+
+
+def test_store_is_skipped_after_an_invalidation():
+    cache = MemoryBackend(max_entries=10, ttl=60)
+    generation = cache.generation()
+    # A write commits and invalidates while the reader is querying
+    cache.delete("post:1", "comments:1")
+    cache.set("post:1", {"body": "stale"}, generation)
+    assert cache.get("post:1") is None
+
+    cache.set("post:1", {"body": "fresh"}, cache.generation())
+    assert cache.get("post:1") == {"body": "fresh"}
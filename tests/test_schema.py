@@ -0,0 +1,42 @@
+"""create_all() builds the whole schema from the models alone.
+
+The SQLite search tables are created by DDL listeners on the posts table.
+A fresh interpreter that imports only app.database.models (none of the
+repositories) must still get them.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+CREATE_ALL = """
+import json, sys
+from sqlalchemy import text
+from app.database.database import Base, engine
+from app.database import models
+Base.metadata.create_all(engine)
+with engine.connect() as conn:
+    tables = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'")).scalars()
+    print(json.dumps({
+        "tables": sorted(tables),
+        "repositories": sorted(name for name in sys.modules if name.startswith("app.repositories")),
+    }))
+"""
+
+
+def test_create_all_builds_search_tables(tmp_path):
+    env = {
+        **os.environ,
+        "DATABASE_BACKEND": "sync",
+        "DATABASE_URL": f"sqlite:///{tmp_path}/schema.db",
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", CREATE_ALL],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    schema = json.loads(result.stdout.strip().splitlines()[-1])
+    assert schema["repositories"] == []
+    assert {"posts_fts", "posts_rtree"} <= set(schema["tables"])
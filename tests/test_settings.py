@@ -0,0 +1,30 @@
+"""Settings are read when they are used, not copied when a module is imported."""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.config import get_settings
+from app.repositories import posts
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def settings_env(monkeypatch):
+    yield monkeypatch
+    monkeypatch.undo()
+    get_settings.cache_clear()
+
+
+def test_importing_config_does_not_load_settings():
+    code = "import sys, app.config; assert 'dotenv' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+
+
+def test_repositories_see_reloaded_settings(settings_env):
+    assert posts._listing_index() is None
+    settings_env.setenv("SEARCH_ENGINE", "memory")
+    get_settings.cache_clear()
+    assert posts._listing_index() is not None
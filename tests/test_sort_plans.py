@@ -0,0 +1,86 @@
+"""EXPLAIN QUERY PLAN regression tests for sorted search pages.
+
+For every `sort` order, with and without filters, the first page and a
+cursor page must read rows from an index in sort order: a "USE TEMP
+B-TREE FOR ORDER BY" step (a sort of every matching row) or a table scan
+without an index fails. A price range with a non-price order cannot be
+served by one index; SQLite seeks the price range and sorts it, so those
+cases only have to avoid the table scan.
+"""
+import random
+
+import pytest
+from sqlalchemy import insert
+
+from app.database.models import Post, PostType, User
+from app.repositories.posts import SORT_ORDERS, PostRepository
+
+from .conftest import explain
+
+PAGE = 5
+
+# name -> (type, rooms_count, price_from, price_until)
+FILTERS = {
+    "no filter": (None, None, 0, None),
+    "type": ("rent", None, 0, None),
+    "type+rooms": ("buy", 2, 0, None),
+    "price range": (None, None, 1_000_000, 5_000_000),
+}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def listings():
+    from app.database.database import SessionLocal
+
+    rng = random.Random(1)
+    db = SessionLocal()
+    try:
+        user = User(username="sorted@example.com", phone="+77015550202", password="x",
+                    name="Sorted", city="Almaty")
+        db.add(user)
+        db.flush()
+        db.execute(insert(Post), [
+            {"user_id": user.id, "type": rng.choice(list(PostType)),
+             "price": rng.randrange(50_000, 10_000_000, 1000), "address": f"Sorted street {i}",
+             "area": round(rng.uniform(20, 200), 1), "rooms_count": rng.randint(1, 6),
+             "description": "sorted listing"}
+            for i in range(1000)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def page_plan(statements):
+    pages = [
+        (statement, parameters) for statement, parameters in list(statements)
+        if statement.lstrip().startswith("SELECT") and "ORDER BY" in statement
+        and "LIMIT" in statement
+    ]
+    assert pages, "no page statement was sent"
+    return explain(*pages[-1])
+
+
+@pytest.mark.parametrize("sort", SORT_ORDERS)
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("page", ["first", "cursor"])
+def test_sorted_pages_read_an_index_in_order(db, statements, sort, filters, page):
+    repository = PostRepository()
+    type, rooms_count, price_from, price_until = FILTERS[filters]
+    cursor = None
+    if page == "cursor":
+        _, _, cursor = repository.get_posts(
+            db, PAGE, 0, type, rooms_count, price_from, price_until, total="none", sort=sort
+        )
+        assert cursor is not None, "the seeded listings fit on one page"
+        statements.clear()
+    repository.get_posts(
+        db, PAGE, 0, type, rooms_count, price_from, price_until, cursor,
+        total="none", sort=sort,
+    )
+    plan = page_plan(statements)
+
+    scans = [step for step in plan if step.startswith("SCAN posts") and "INDEX" not in step]
+    assert not scans, plan
+    if filters != "price range" or SORT_ORDERS[sort][0] is Post.price:
+        assert not any("TEMP B-TREE" in step for step in plan), plan